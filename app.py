@@ -1,6 +1,151 @@
+import multiprocessing
+import os
+import sys
+import time
 import tkinter as tk
-from tkinter import messagebox
+from collections import deque
+from tkinter import messagebox, ttk
+import profiling
+from cache import ResultCache, key_for
 from matrix import Matrix
+from operations import compute, format_result, parse_matrix
+from sparse import SparseMatrix
+
+# How often (in ms) the GUI checks on running computations
+POLL_INTERVAL = 100
+
+# Size (in pixels) of one cell of the result grid
+CELL_WIDTH = 110
+CELL_HEIGHT = 22
+
+
+def run_operation(operation: str, matrix_a, matrix_b, conn, collect_stats: bool = False):
+    """
+    Worker process entry point: runs one operation and sends back ('ok', result, stats)
+    or ('error', message, stats) through the pipe. The result is sent as is, the GUI
+    only formats the part of it that is on screen. stats is the profiling report of
+    the operation when collect_stats is set, else None.
+    """
+    profiler = profiling.enable() if collect_stats else None
+    stats = None
+    try:
+        content = compute(operation, matrix_a, matrix_b)
+        status = 'ok'
+    except ValueError as e:
+        status, content = 'error', str(e)
+    except Exception as e:
+        status, content = 'error', f"An unexpected error occurred: {e}"
+    if profiler is not None:
+        profiling.disable(profiler)
+        stats = profiler.report()
+    conn.send((status, content, stats))
+    conn.close()
+
+
+class Job:
+    """A computation queued or running in its own worker process."""
+
+    def __init__(self, operation: str, title: str, matrix_a, matrix_b=None, collect_stats: bool = False, show_stats: bool = False):
+        # collect_stats: the worker sends back its profiling report
+        # show_stats: the report goes to the Stats panel (else only to the MATRIX_PROFILE report)
+        self.operation = operation
+        self.collect_stats = collect_stats or show_stats
+        self.show_stats = show_stats
+        self.title = title
+        self.cache_key = key_for(operation, matrix_a, matrix_b)
+        self.matrix_a = matrix_a
+        self.matrix_b = matrix_b
+        self.process = None
+        self.conn = None
+        self.started = None
+
+    def start(self):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(target=run_operation, args=(self.operation, self.matrix_a, self.matrix_b, sender, self.collect_stats), daemon=True)
+        self.process.start()
+        sender.close()
+        self.conn = receiver
+        self.started = time.monotonic()
+        # the worker has its own copy now
+        self.matrix_a = self.matrix_b = None
+
+    def elapsed(self) -> float:
+        return 0.0 if self.started is None else time.monotonic() - self.started
+
+    def cancel(self):
+        """Kills the worker process (if it was started)."""
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+        if self.conn is not None:
+            self.conn.close()
+
+
+class MatrixGrid(tk.Frame):
+    """
+    Scrollable view of a matrix result. Only the cells inside the visible window
+    are formatted and drawn, so the size of the matrix doesn't matter.
+    """
+
+    def __init__(self, master, font=('Courier New', 12)):
+        super().__init__(master)
+        self.matrix = None
+        self.font = font
+
+        self.canvas = tk.Canvas(self, height=10 * CELL_HEIGHT, relief=tk.SUNKEN, borderwidth=2, background='white',
+                                xscrollincrement=CELL_WIDTH, yscrollincrement=CELL_HEIGHT)
+        xscroll = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        yscroll = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.canvas.yview)
+        # the canvas reports every change of its view (scrolling, resizing) through these
+        self.canvas.config(xscrollcommand=lambda *args: self.on_view_change(xscroll, *args),
+                           yscrollcommand=lambda *args: self.on_view_change(yscroll, *args))
+        self.info = tk.Label(self, font=('Roboto', 10))
+
+        self.canvas.grid(row=0, column=0, sticky='nsew')
+        yscroll.grid(row=0, column=1, sticky='ns')
+        xscroll.grid(row=1, column=0, sticky='ew')
+        self.info.grid(row=2, column=0, columnspan=2, sticky='w')
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.canvas.bind('<MouseWheel>', lambda e: self.canvas.yview_scroll(-e.delta // 120 or (-1 if e.delta > 0 else 1), 'units'))
+        self.canvas.bind('<Shift-MouseWheel>', lambda e: self.canvas.xview_scroll(-e.delta // 120 or (-1 if e.delta > 0 else 1), 'units'))
+        self.canvas.bind('<Button-4>', lambda e: self.canvas.yview_scroll(-3, 'units'))
+        self.canvas.bind('<Button-5>', lambda e: self.canvas.yview_scroll(3, 'units'))
+
+    def show(self, matrix):
+        """Displays matrix (a Matrix or SparseMatrix) from its top left corner."""
+        self.matrix = matrix
+        self.canvas.config(scrollregion=(0, 0, matrix.cols * CELL_WIDTH, matrix.rows * CELL_HEIGHT))
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+        self.redraw()
+
+    def on_view_change(self, scrollbar, first, last):
+        scrollbar.set(first, last)
+        self.redraw()
+
+    def redraw(self):
+        """Formats and draws the cells that are currently in view."""
+        self.canvas.delete('cell')
+        if self.matrix is None:
+            return
+
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        col_start, row_start = int(left // CELL_WIDTH), int(top // CELL_HEIGHT)
+        col_stop = min(self.matrix.cols, int((left + self.canvas.winfo_width()) // CELL_WIDTH) + 1)
+        row_stop = min(self.matrix.rows, int((top + self.canvas.winfo_height()) // CELL_HEIGHT) + 1)
+
+        cells = self.matrix.format_cells(row_start, row_stop, col_start, col_stop)
+        for i, row in enumerate(cells, row_start):
+            y = i * CELL_HEIGHT + CELL_HEIGHT // 2
+            for j, text in enumerate(row, col_start):
+                self.canvas.create_text((j + 1) * CELL_WIDTH - 8, y, text=text, anchor='e', font=self.font, tags='cell')
+
+        if cells:
+            self.info.config(text=f"Showing rows {row_start + 1}–{row_stop}, columns {col_start + 1}–{col_stop} "
+                                  f"of {self.matrix.rows}x{self.matrix.cols}")
+
 
 class MatrixCalculatorApp(tk.Tk):
 
@@ -12,6 +157,23 @@ class MatrixCalculatorApp(tk.Tk):
         self.current_op = None  # Stores the pending operation ('add', 'sub', 'mul')
         self.matrix_a = None    # Stores the first matrix operand
 
+        # Background computations: at most max_workers processes run at once, the rest wait in pending
+        self.max_workers = os.cpu_count() or 1
+        self.running_jobs = []
+        self.pending_jobs = deque()
+        self.listed_jobs = []   # Jobs in the order they are shown in the jobs list
+        self.polling = False
+
+        # Statistics of the operations run while 'Collect stats' is checked
+        self.stats = profiling.Profiler()
+        self.collect_stats = tk.BooleanVar(value=False)
+        self.stats_window = None
+        # MATRIX_PROFILE=1: stats of every computation, printed to stderr when the app is closed
+        self.session_stats = profiling.Profiler() if profiling.requested() else None
+
+        # Results already computed in this session, so pressing a button again is instant
+        self.result_cache = ResultCache()
+
         main_frame = tk.Frame(self, padx=10, pady=10)
         main_frame.pack(expand=True, fill='both')
 
@@ -61,6 +223,27 @@ class MatrixCalculatorApp(tk.Tk):
         self.result_output = tk.Text(output_frame, height=10, width=80, font=('Courier New', 12), state=tk.DISABLED, relief=tk.SUNKEN, borderwidth=2)
         self.result_output.pack(padx=5, pady=5, expand=True, fill='both')
 
+        # Matrix results are shown in a grid instead, it takes the place of result_output
+        self.result_grid = MatrixGrid(output_frame)
+
+        # Running / queued computations
+        jobs_frame = tk.LabelFrame(main_frame, text='Computations', padx=10, pady=10)
+        jobs_frame.grid(row=3, column=0, padx=10, pady=10, sticky='ew')
+
+        self.progress = ttk.Progressbar(jobs_frame, mode='indeterminate', length=200)
+        self.progress.grid(row=0, column=0, padx=5, pady=5, sticky='w')
+        self.jobs_status = tk.Label(jobs_frame, text='Idle', font=('Roboto', 10))
+        self.jobs_status.grid(row=0, column=1, padx=5, pady=5, sticky='w')
+        tk.Checkbutton(jobs_frame, text='Collect stats', variable=self.collect_stats, font=('Roboto', 10)).grid(row=0, column=2, padx=5, pady=5)
+        tk.Button(jobs_frame, text='Stats', command=self.show_stats, width=12, font=('Roboto', 10)).grid(row=0, column=3, padx=5, pady=5)
+        tk.Button(jobs_frame, text='Cancel', command=self.cancel_jobs, width=12, font=('Roboto', 10)).grid(row=0, column=4, padx=5, pady=5, sticky='e')
+        jobs_frame.grid_columnconfigure(1, weight=1)
+
+        self.jobs_list = tk.Listbox(jobs_frame, height=4, selectmode=tk.EXTENDED, font=('Courier New', 10))
+        self.jobs_list.grid(row=1, column=0, columnspan=5, padx=5, pady=5, sticky='ew')
+
+        self.protocol('WM_DELETE_WINDOW', self.on_close)
+
     def reset_state(self):
         """Clears all inputs and resets the state machine."""
         self.current_op = None
@@ -68,40 +251,169 @@ class MatrixCalculatorApp(tk.Tk):
         self.matrix_inpt_a.delete('1.0', tk.END)
         self.display_result("Ready to Calculate...", "The calculator state has been reset.")
 
-    def get_matrix_from_input(self, matrix_name: str = "Matrix") -> Matrix:
+    def get_matrix_from_input(self, matrix_name: str = "Matrix") -> Matrix | SparseMatrix:
         """
-        Reads text from the single input box, parses it, and returns a Matrix object.
+        Reads text from the single input box, parses it, and returns a Matrix object
+        (or a SparseMatrix when the input is mostly zeros).
         """
         input_str = self.matrix_inpt_a.get('1.0', tk.END)
-        
-        if not input_str.strip():
-            raise ValueError(f"{matrix_name} input cannot be empty.")
-        
-        row_strings = input_str.strip().split('\n')
-        matrix_data = []
-        
-        for i, row_str in enumerate(row_strings):
-            elements = [s.strip() for s in row_str.split(',')]
-            elements = [e for e in elements if e]
-
-            try:
-                float_row = [float(e) for e in elements]
-            except ValueError as e:
-                raise ValueError(f"Invalid element in {matrix_name}, row {i+1}. Ensure all elements are numeric.") from e
-            
-            if float_row:
-                matrix_data.append(float_row)
-        
-        return Matrix(matrix_data)
+        return parse_matrix(input_str, matrix_name)
     
     def display_result(self, title: str, content: str):
         """Helper to update the output area with the result."""
+        self.result_grid.pack_forget()
+        self.result_output.pack(padx=5, pady=5, expand=True, fill='both')
         self.result_title.config(text=title)
         self.result_output.config(state=tk.NORMAL)
         self.result_output.delete('1.0', tk.END)
         self.result_output.insert(tk.END, content)
         self.result_output.config(state=tk.DISABLED)
 
+    def show_result(self, title: str, operation: str, result):
+        """Shows matrices in the result grid and everything else (determinants) as text."""
+        if not isinstance(result, (Matrix, SparseMatrix)):
+            self.display_result(title, format_result(operation, result))
+            return
+        self.result_output.pack_forget()
+        self.result_grid.pack(padx=5, pady=5, expand=True, fill='both')
+        self.result_title.config(text=title)
+        self.result_grid.show(result)
+
+    def submit_job(self, operation: str, title: str, matrix_a, matrix_b=None):
+        """Queues an operation to run in a worker process, the result is shown when it finishes."""
+        job = Job(operation, title, matrix_a, matrix_b, self.session_stats is not None, self.collect_stats.get())
+        result = self.result_cache.get(job.cache_key)
+        if result is not None:
+            self.show_result(f"{title} (cached)", operation, result)
+            return
+
+        self.pending_jobs.append(job)
+        self.start_pending_jobs()
+        if not self.polling:
+            self.polling = True
+            self.progress.start()
+            self.after(POLL_INTERVAL, self.poll_jobs)
+        self.update_jobs_view()
+
+    def start_pending_jobs(self):
+        while self.pending_jobs and len(self.running_jobs) < self.max_workers:
+            job = self.pending_jobs.popleft()
+            job.start()
+            self.running_jobs.append(job)
+
+    def poll_jobs(self):
+        """Called through after(): collects finished results and keeps the indicators up to date."""
+        for job in list(self.running_jobs):
+            ready = job.conn.poll()
+            if not ready:
+                if job.process.is_alive():
+                    continue
+                # the worker can have sent its result and exited since the poll above
+                ready = job.conn.poll()
+
+            status, content, stats = 'error', 'The computation stopped without a result.', None
+            if ready:
+                try:
+                    status, content, stats = job.conn.recv()
+                except EOFError:
+                    pass
+            job.cancel()
+
+            self.running_jobs.remove(job)
+            if stats and self.session_stats is not None:
+                self.session_stats.merge(stats)
+            if stats and job.show_stats:
+                self.stats.merge(stats)
+                self.refresh_stats()
+            if status == 'ok':
+                self.result_cache.put(job.cache_key, content)
+                self.show_result(f"{job.title} — {job.elapsed():.2f} s", job.operation, content)
+            else:
+                messagebox.showerror("Input Error / Calculation Failed", content)
+
+        self.start_pending_jobs()
+        self.update_jobs_view()
+
+        if self.running_jobs or self.pending_jobs:
+            self.after(POLL_INTERVAL, self.poll_jobs)
+        else:
+            self.polling = False
+            self.progress.stop()
+
+    def all_jobs(self) -> list:
+        return self.running_jobs + list(self.pending_jobs)
+
+    def update_jobs_view(self):
+        """Refreshes the list of computations and the elapsed time indicator."""
+        selected = {self.listed_jobs[i] for i in self.jobs_list.curselection()}
+        jobs = self.all_jobs()
+
+        self.jobs_list.delete(0, tk.END)
+        for i, job in enumerate(jobs):
+            state = f"running {job.elapsed():6.1f} s" if job.started is not None else "queued"
+            self.jobs_list.insert(tk.END, f"{state:<18} {job.title}")
+            if job in selected:
+                self.jobs_list.selection_set(i)
+        self.listed_jobs = jobs
+
+        if jobs:
+            self.jobs_status.config(text=f"{len(self.running_jobs)} running, {len(self.pending_jobs)} queued")
+        else:
+            self.jobs_status.config(text='Idle')
+
+    def cancel_jobs(self):
+        """Kills the selected computations, or all of them if none is selected."""
+        selected = [self.listed_jobs[i] for i in self.jobs_list.curselection()]
+        for job in selected or self.all_jobs():
+            job.cancel()
+            if job in self.running_jobs:
+                self.running_jobs.remove(job)
+            elif job in self.pending_jobs:
+                self.pending_jobs.remove(job)
+        self.start_pending_jobs()
+        self.update_jobs_view()
+        if not self.all_jobs():
+            self.display_result("Cancelled", "The computation was cancelled.")
+
+    def show_stats(self):
+        """Opens (or raises) the Stats panel with the profiling report of the collected operations."""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            self.refresh_stats()
+            return
+
+        self.stats_window = tk.Toplevel(self)
+        self.stats_window.title('Stats')
+        self.stats_output = tk.Text(self.stats_window, height=12, width=82, font=('Courier New', 10), state=tk.DISABLED)
+        self.stats_output.pack(padx=10, pady=10, expand=True, fill='both')
+        tk.Button(self.stats_window, text='Reset', command=self.reset_stats, width=12, font=('Roboto', 10)).pack(pady=5)
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        if self.stats_window is None or not self.stats_window.winfo_exists():
+            return
+        report = self.stats.format_report()
+        cache = self.result_cache.stats()
+        report += f"\n\nResult cache: {cache['entries']} entries, {cache['bytes'] / 1024:.1f} KiB, {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%} hit rate)"
+        if not self.collect_stats.get() and not self.stats.stats:
+            report += "\n\nCheck 'Collect stats' to record the next computations."
+        self.stats_output.config(state=tk.NORMAL)
+        self.stats_output.delete('1.0', tk.END)
+        self.stats_output.insert(tk.END, report)
+        self.stats_output.config(state=tk.DISABLED)
+
+    def reset_stats(self):
+        self.stats.reset()
+        self.result_cache.clear()
+        self.refresh_stats()
+
+    def on_close(self):
+        for job in self.all_jobs():
+            job.cancel()
+        if self.session_stats is not None:
+            print(self.session_stats.format_report(), file=sys.stderr)
+        self.destroy()
+
     def perform_operation(self, operation: str):
         """
         Handles both unary operations (direct calculation) and binary operations 
@@ -118,25 +430,19 @@ class MatrixCalculatorApp(tk.Tk):
                     return
 
                 matrix_a = self.get_matrix_from_input("Matrix A")
-                result = None
                 title = ''
                 
                 if operation == 'det':
-                    result = matrix_a.det()
                     title = 'Determinant (det(A))'
-                    self.display_result(title, f"{result:.6f}")
                 elif operation == 'inv':
-                    result = matrix_a.inverse()
                     title = 'Inverse Matrix (A⁻¹)'
-                    self.display_result(title, str(result))
                 elif operation == "rref":
-                    result = matrix_a.rref()
                     title = "Reduced Row Echelon Form (RREF)"
-                    self.display_result(title, str(result))
                 elif operation == "tra":
-                    result = matrix_a.transpose()
                     title = "Transpose Matrix (Aᵀ)"
-                    self.display_result(title, str(result))
+
+                # The calculation runs in a worker process, the result is displayed by poll_jobs
+                self.submit_job(operation, title, matrix_a)
             
             # Binary Operations (Two-Step State Machine)
             elif operation in ['add', 'sub', 'mul']:
@@ -150,18 +456,21 @@ class MatrixCalculatorApp(tk.Tk):
                 if self.matrix_a is not None and self.current_op == operation:
                     
                     matrix_b = self.get_matrix_from_input("Matrix B")
+
+                    # Check the dimensions right away so Matrix B can be corrected and re-entered
+                    if operation in ['add', 'sub'] and (self.matrix_a.rows != matrix_b.rows or self.matrix_a.cols != matrix_b.cols):
+                        raise ValueError(f"Matrices must have the same dimensions to {'add' if operation == 'add' else 'subtract'}")
+                    if operation == 'mul' and self.matrix_a.cols != matrix_b.rows:
+                        raise ValueError("Number of columns in the first matrix must equal number of rows in the second matrix")
                     
                     if operation == 'add':
-                        result = self.matrix_a + matrix_b 
                         title = op_map[operation] + ' (A + B)'
                     elif operation == 'sub':
-                        result = self.matrix_a - matrix_b 
                         title = op_map[operation] + ' (A - B)'
                     elif operation == 'mul':
-                        result = self.matrix_a * matrix_b 
                         title = op_map[operation] + ' (A * B)'
                         
-                    self.display_result(title, str(result))
+                    self.submit_job(operation, title, self.matrix_a, matrix_b)
                     
                     # Reset state for the next calculation
                     self.current_op = None
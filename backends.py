@@ -0,0 +1,289 @@
+import operator
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Every backend works on row-major array('d') buffers plus their shape, so the
+# Matrix class does not care which one is doing the arithmetic. rref() adds the
+# elementary row operations it performs (swaps, scalings, eliminations) to the
+# backend's row_operations counter, which the profiler reads.
+
+class PythonBackend:
+    '''Pure Python reference implementation.'''
+    name = 'python'
+    row_operations = 0
+
+    def __init__(self, block_size=64, strassen_threshold=None):
+        # block_size: edge of the tiles used by the multiplication kernel
+        # strassen_threshold: square products at least this big recurse with Strassen,
+        # None (the default) never does. In pure Python the extra additions and copies
+        # eat most of the saved multiplications, see benchmark.py before turning it on
+        self.block_size = block_size
+        self.strassen_threshold = strassen_threshold
+
+    def add(self, a, b):
+        return array('d', map(operator.add, a, b))
+
+    def sub(self, a, b):
+        return array('d', map(operator.sub, a, b))
+
+    def matmul(self, a, b, m, n, p):
+        # (m x n) * (n x p)
+        if self.strassen_threshold is not None and m == n == p and n >= self.strassen_threshold:
+            return self._matmul_strassen(a, b, n)
+        return self._matmul_blocked(a, b, m, n, p)
+
+    def _matmul_blocked(self, a, b, m, n, p):
+        # Tiled kernel in i-k-j order. Each tile of b is sliced into row buffers once and
+        # then reused for every row of a, and the innermost loop runs along a row of b
+        # instead of down one of its columns.
+        bs = self.block_size
+        result = [[0.0] * p for _ in range(m)]
+
+        for k0 in range(0, n, bs):
+            k1 = min(k0 + bs, n)
+            for j0 in range(0, p, bs):
+                j1 = min(j0 + bs, p)
+                tile = [b[k * p + j0:k * p + j1] for k in range(k0, k1)]
+                for i in range(m):
+                    out = result[i]
+                    acc = out[j0:j1]
+                    for aik, brow in zip(a[i * n + k0:i * n + k1], tile):
+                        if aik:
+                            acc = [x + aik * y for x, y in zip(acc, brow)]
+                    out[j0:j1] = acc
+
+        flat = array('d')
+        for row in result:
+            flat.extend(row)
+        return flat
+
+    def _matmul_strassen(self, a, b, n):
+        # Strassen's algorithm for n x n products: 7 half-size products instead of 8,
+        # falling back to the tiled kernel once the blocks drop below the threshold
+        if n < self.strassen_threshold:
+            return self._matmul_blocked(a, b, n, n, n)
+
+        if n % 2:
+            # pad odd sizes with a zero row and column, then crop the result
+            c = self._matmul_strassen(_pad(a, n), _pad(b, n), n + 1)
+            return _crop(c, n + 1, n)
+
+        h = n // 2
+        a11, a12, a21, a22 = _quadrants(a, n)
+        b11, b12, b21, b22 = _quadrants(b, n)
+        add, sub = self.add, self.sub
+
+        m1 = self._matmul_strassen(add(a11, a22), add(b11, b22), h)
+        m2 = self._matmul_strassen(add(a21, a22), b11, h)
+        m3 = self._matmul_strassen(a11, sub(b12, b22), h)
+        m4 = self._matmul_strassen(a22, sub(b21, b11), h)
+        m5 = self._matmul_strassen(add(a11, a12), b22, h)
+        m6 = self._matmul_strassen(sub(a21, a11), add(b11, b12), h)
+        m7 = self._matmul_strassen(sub(a12, a22), add(b21, b22), h)
+
+        c11 = add(sub(add(m1, m4), m5), m7)
+        c12 = add(m3, m5)
+        c21 = add(m2, m4)
+        c22 = add(add(sub(m1, m2), m3), m6)
+
+        result = array('d')
+        for i in range(h):
+            result.extend(c11[i * h:(i + 1) * h])
+            result.extend(c12[i * h:(i + 1) * h])
+        for i in range(h):
+            result.extend(c21[i * h:(i + 1) * h])
+            result.extend(c22[i * h:(i + 1) * h])
+        return result
+
+    def rref(self, a, rows, cols):
+        # I love python and it's way of rounding numbers so that it returns a fuck ass -0.00
+        def clean(x, eps=1e-10):
+            return 0.0 if abs(x) < eps else x
+
+        A = [a[i * cols:(i + 1) * cols].tolist() for i in range(rows)]
+
+        r = 0
+
+        for c in range(cols):
+            pivot = None
+            for i in range(r, rows):
+                if A[i][c] != 0:
+                    pivot = i
+                    break
+
+            if pivot is None:
+                continue
+
+            if pivot != r:
+                A[r], A[pivot] = A[pivot], A[r]
+                self.row_operations += 1
+
+            pivot_value = A[r][c]
+            A[r] = [x / pivot_value for x in A[r]]
+            self.row_operations += 1
+
+            for i in range(rows):
+                if i != r and A[i][c] != 0:
+                    factor = A[i][c]
+                    A[i] = [A[i][j] - factor * A[r][j] for j in range(cols)]
+                    self.row_operations += 1
+
+            r += 1
+            if r == rows:
+                break
+
+        return array('d', [clean(x) for row in A for x in row])
+
+
+def _quadrants(x, n):
+    # Split an n x n row-major buffer (n even) into its four n/2 x n/2 blocks
+    h = n // 2
+    blocks = [array('d') for _ in range(4)]
+    for i in range(n):
+        top = 0 if i < h else 2
+        blocks[top].extend(x[i * n:i * n + h])
+        blocks[top + 1].extend(x[i * n + h:(i + 1) * n])
+    return blocks
+
+
+def _pad(x, n):
+    # n x n buffer -> (n + 1) x (n + 1) buffer with a trailing zero row and column
+    padded = array('d')
+    for i in range(n):
+        padded.extend(x[i * n:(i + 1) * n])
+        padded.append(0.0)
+    padded.extend(array('d', bytes(8 * (n + 1))))
+    return padded
+
+
+def _crop(x, n, size):
+    # Top-left size x size block of an n x n buffer
+    cropped = array('d')
+    for i in range(size):
+        cropped.extend(x[i * n:i * n + size])
+    return cropped
+
+
+class NumpyBackend:
+    '''Vectorized implementation, only available when NumPy is installed.'''
+    name = 'numpy'
+    row_operations = 0
+
+    def __init__(self):
+        if numpy is None:
+            raise ValueError("The numpy backend requires NumPy to be installed")
+
+    @staticmethod
+    def _view(a, rows, cols):
+        # zero-copy NumPy view of an array('d') buffer
+        return numpy.frombuffer(a, dtype=numpy.float64).reshape(rows, cols)
+
+    @staticmethod
+    def _to_array(x):
+        result = array('d')
+        result.frombytes(numpy.ascontiguousarray(x, dtype=numpy.float64).tobytes())
+        return result
+
+    def add(self, a, b):
+        return self._to_array(self._view(a, 1, len(a)) + self._view(b, 1, len(b)))
+
+    def sub(self, a, b):
+        return self._to_array(self._view(a, 1, len(a)) - self._view(b, 1, len(b)))
+
+    def matmul(self, a, b, m, n, p):
+        return self._to_array(self._view(a, m, n) @ self._view(b, n, p))
+
+    def rref(self, a, rows, cols):
+        # same pivot rule as the reference (first non-zero entry), with whole-row updates
+        A = self._view(a, rows, cols).copy()
+        r = 0
+
+        for c in range(cols):
+            nonzero = numpy.flatnonzero(A[r:, c])
+            if nonzero.size == 0:
+                continue
+            pivot = r + nonzero[0]
+
+            if pivot != r:
+                A[[r, pivot]] = A[[pivot, r]]
+                self.row_operations += 1
+
+            A[r] /= A[r, c]
+
+            factors = A[:, c].copy()
+            factors[r] = 0.0
+            A -= numpy.outer(factors, A[r])
+            self.row_operations += 1 + int(numpy.count_nonzero(factors))
+
+            r += 1
+            if r == rows:
+                break
+
+        A[numpy.abs(A) < 1e-10] = 0.0
+        return self._to_array(A)
+
+
+def _parallel_backend():
+    # imported lazily, parallel.py builds on this module
+    from parallel import ParallelBackend
+    return ParallelBackend()
+
+
+BACKENDS = {'python': PythonBackend, 'parallel': _parallel_backend}
+if numpy is not None:
+    BACKENDS['numpy'] = NumpyBackend
+
+
+def get_backend(backend=None):
+    '''Returns a backend instance from a name, an instance, or None for the fastest available one.'''
+    if backend is None:
+        backend = 'numpy' if numpy is not None else 'python'
+
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', available: {', '.join(BACKENDS)}")
+        return BACKENDS[backend]()
+
+    return backend
+
+
+def compare_backends(first, second, sizes=(1, 2, 3, 8, 17, 40), tol=1e-9, seed=0):
+    '''Runs every operation on both backends with random inputs and raises if the results differ by more than tol.'''
+    import random
+
+    first = get_backend(first)
+    second = get_backend(second)
+    rng = random.Random(seed)
+
+    def check(name, x, y):
+        if len(x) != len(y):
+            raise AssertionError(f"{name}: result sizes differ ({len(x)} != {len(y)})")
+        for u, v in zip(x, y):
+            if abs(u - v) > tol * max(1.0, abs(u), abs(v)):
+                raise AssertionError(f"{name}: {first.name} gave {u}, {second.name} gave {v}")
+
+    for n in sizes:
+        a = array('d', [rng.uniform(-10, 10) for _ in range(n * n)])
+        b = array('d', [rng.uniform(-10, 10) for _ in range(n * n)])
+        # a rank-deficient, rectangular input so rref has to skip columns
+        c = array('d', [float(i % 3) * (j + 1) for i in range(n) for j in range(n + 1)])
+
+        check(f"add {n}x{n}", first.add(a, b), second.add(a, b))
+        check(f"sub {n}x{n}", first.sub(a, b), second.sub(a, b))
+        check(f"matmul {n}x{n}", first.matmul(a, b, n, n, n), second.matmul(a, b, n, n, n))
+        check(f"rref {n}x{n}", first.rref(a, n, n), second.rref(a, n, n))
+        check(f"rref {n}x{n + 1}", first.rref(c, n, n + 1), second.rref(c, n, n + 1))
+
+
+if __name__ == '__main__':
+    names = list(BACKENDS)
+    for other in names[1:]:
+        compare_backends(names[0], other)
+        print(f"{names[0]} and {other} backends agree")
+    if len(names) == 1:
+        print("Only the python backend is available (NumPy is not installed)")
@@ -0,0 +1,191 @@
+"""
+Benchmark harness for the Matrix and vector operations.
+
+Sweeps matrix sizes for every operation, records the wall time and the peak
+memory of each run, and writes the results as JSON or CSV. Two runs can be
+compared to flag regressions:
+
+    python benchmark.py run --output before.json
+    python benchmark.py run --output after.json
+    python benchmark.py compare before.json after.json --threshold 10
+"""
+import argparse
+import csv
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from matrix import Matrix
+from sparse import SparseMatrix
+from vectors import Vector2d, Vector3d, Vector2dArray, Vector3dArray
+
+DEFAULT_SIZES = [2, 4, 8, 16, 32, 64, 128, 256, 512]
+
+
+def random_matrix(n: int, density: float, rng: random.Random) -> Matrix:
+    """n x n matrix where roughly `density` of the entries are non-zero (kept invertible by a strong diagonal)."""
+    data = [[rng.uniform(-1, 1) if rng.random() < density else 0.0 for _ in range(n)] for _ in range(n)]
+    for i in range(n):
+        data[i][i] = n + rng.random()
+    return Matrix(data)
+
+
+def matrix_setup(density: float, sparse: bool = False):
+    def setup(n, rng):
+        a, b = random_matrix(n, density, rng), random_matrix(n, density, rng)
+        if sparse:
+            return SparseMatrix.from_dense(a), SparseMatrix.from_dense(b)
+        return a, b
+    return setup
+
+
+def vector_setup(cls, array_cls, dims):
+    # the size of a vector benchmark is the number of vectors (n * n, to match the matrix element count)
+    def setup(n, rng):
+        count = n * n
+        vectors = [cls(*[rng.uniform(-1, 1) for _ in range(dims)]) for _ in range(count)]
+        others = [cls(*[rng.uniform(-1, 1) for _ in range(dims)]) for _ in range(count)]
+        return vectors, others, array_cls.from_vectors(vectors), array_cls.from_vectors(others)
+    return setup
+
+
+# name -> (setup(n, rng) returning the operands, operation(operands))
+OPERATIONS = {
+    'det':              (matrix_setup(1.0), lambda ops: ops[0].copy().det()),
+    'inverse':          (matrix_setup(1.0), lambda ops: ops[0].copy().inverse()),
+    'rref':             (matrix_setup(1.0), lambda ops: ops[0].rref()),
+    'mul':              (matrix_setup(1.0), lambda ops: ops[0] * ops[1]),
+    'add':              (matrix_setup(1.0), lambda ops: ops[0] + ops[1]),
+    'transpose':        (matrix_setup(1.0), lambda ops: ops[0].transpose().copy()),
+    'det_sparse':       (matrix_setup(0.05), lambda ops: ops[0].copy().det()),
+    'mul_sparse':       (matrix_setup(0.05), lambda ops: ops[0] * ops[1]),
+    'mul_csr':          (matrix_setup(0.05, sparse=True), lambda ops: ops[0] * ops[1]),
+    'add_csr':          (matrix_setup(0.05, sparse=True), lambda ops: ops[0] + ops[1]),
+    'vec2_dotp':        (vector_setup(Vector2d, Vector2dArray, 2), lambda ops: [v.dotp(w) for v, w in zip(ops[0], ops[1])]),
+    'vec3_crossp':      (vector_setup(Vector3d, Vector3dArray, 3), lambda ops: [v.crossp(w) for v, w in zip(ops[0], ops[1])]),
+    'vec3_length':      (vector_setup(Vector3d, Vector3dArray, 3), lambda ops: [v.length for v in ops[0]]),
+    'vec3array_dotp':   (vector_setup(Vector3d, Vector3dArray, 3), lambda ops: ops[2].dotp(ops[3])),
+    'vec3array_crossp': (vector_setup(Vector3d, Vector3dArray, 3), lambda ops: ops[2].crossp(ops[3])),
+}
+
+
+def measure(operation, operands, repeat: int):
+    """Best wall time over `repeat` runs, and the peak memory allocated by one run."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation(operands)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    operation(operands)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def run(operations: list, sizes: list, repeat: int, max_seconds: float, seed: int) -> dict:
+    """
+    Runs the sweep. Once an operation takes longer than max_seconds at some size,
+    the larger sizes are skipped for it so a sweep always finishes in reasonable time.
+    """
+    results = []
+    for name in operations:
+        setup, operation = OPERATIONS[name]
+        for n in sizes:
+            operands = setup(n, random.Random(seed))
+            seconds, peak = measure(operation, operands, repeat)
+            results.append({'operation': name, 'size': n, 'seconds': seconds, 'peak_bytes': peak})
+            print(f"{name:<18} n={n:<5} {seconds * 1000:12.3f} ms {peak / 1024:12.1f} KiB", file=sys.stderr)
+            if seconds > max_seconds:
+                break
+
+    return {
+        'python': platform.python_version(),
+        'backend': Matrix._backend.name,
+        'results': results,
+    }
+
+
+def save(report: dict, path: str):
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['operation', 'size', 'seconds', 'peak_bytes'])
+            writer.writeheader()
+            writer.writerows(report['results'])
+    else:
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+def load(path: str) -> list:
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            return [{'operation': row['operation'], 'size': int(row['size']), 'seconds': float(row['seconds']), 'peak_bytes': int(row['peak_bytes'])}
+                    for row in csv.DictReader(f)]
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare(baseline: list, current: list, threshold: float) -> list:
+    """
+    Returns the (operation, size, metric, old, new, change %) rows where the current run
+    is more than threshold percent slower (or uses more memory) than the baseline.
+    """
+    old = {(r['operation'], r['size']): r for r in baseline}
+    regressions = []
+    for r in current:
+        before = old.get((r['operation'], r['size']))
+        if before is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if before[metric] <= 0:
+                continue
+            change = (r[metric] - before[metric]) / before[metric] * 100
+            if change > threshold:
+                regressions.append((r['operation'], r['size'], metric, before[metric], r[metric], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Matrix and vector operations.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='sweep the sizes and record the results')
+    run_parser.add_argument('--output', '-o', default='benchmark.json', help='.json or .csv file to write')
+    run_parser.add_argument('--operations', nargs='+', choices=sorted(OPERATIONS), default=list(OPERATIONS))
+    run_parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    run_parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the best one is kept')
+    run_parser.add_argument('--max-seconds', type=float, default=5.0, help='skip larger sizes once one run takes longer than this')
+    run_parser.add_argument('--backend', default=None, help="compute backend for Matrix ('python', 'numpy')")
+    run_parser.add_argument('--seed', type=int, default=0)
+
+    compare_parser = commands.add_parser('compare', help='flag regressions between two runs')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help='percent slowdown (or memory growth) to report')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        if args.backend is not None:
+            Matrix.use_backend(args.backend)
+        report = run(args.operations, args.sizes, args.repeat, args.max_seconds, args.seed)
+        save(report, args.output)
+        print(f"Wrote {len(report['results'])} results to {args.output}")
+        return 0
+
+    regressions = compare(load(args.baseline), load(args.current), args.threshold)
+    for operation, size, metric, before, after, change in regressions:
+        print(f"REGRESSION {operation} n={size} {metric}: {before:.6g} -> {after:.6g} (+{change:.1f}%)")
+    if not regressions:
+        print(f"No regressions above {args.threshold}%")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
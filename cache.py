@@ -0,0 +1,275 @@
+"""
+Content-addressed LRU cache for the results of expensive Matrix operations.
+
+Results are keyed by the operation name plus a hash of the shape and contents
+of the operands, so recomputing det, inverse or rref of an identical matrix is
+a dictionary lookup. The cache is bounded by number of entries and by bytes,
+evicts the least recently used entries first and keeps hit/miss statistics.
+Matrix results are copied going in and coming out, so a caller can never
+change what is stored. An optional directory adds a disk tier that survives
+restarts. It stores numbers, Matrix and SparseMatrix results as raw arrays
+(never pickles, so reading a cache directory can't run code), other values
+are only kept in memory. Unreadable files are deleted and count as misses.
+
+    cache = ResultCache(directory='~/.matrix_cache')
+    inv = cache.compute(A, 'inverse')
+"""
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import OrderedDict
+
+from matrix import Matrix
+from sparse import SparseMatrix
+
+# Operations compute() knows how to run
+OPERATIONS = ('det', 'inverse', 'rref', 'transpose')
+
+# Disk tier files: magic, kind (number, Matrix, SparseMatrix), rows, cols, stored values
+# (little-endian), followed by the arrays
+DISK_SUFFIX = '.result'
+DISK_HEADER = struct.Struct('<4sB3xQQQ')
+DISK_MAGIC = b'LARC'
+NUMBER, DENSE, SPARSE = 0, 1, 2
+
+
+def fingerprint(operand) -> bytes:
+    """Fast hash of the type, shape and contents of a Matrix or SparseMatrix (or of a plain value)."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(operand, Matrix):
+        h.update(b'M%d,%d;' % (operand.rows, operand.cols))
+        h.update(operand._flat().tobytes())
+    elif isinstance(operand, SparseMatrix):
+        h.update(b'S%d,%d;' % (operand.rows, operand.cols))
+        h.update(operand.indptr.tobytes())
+        h.update(operand.indices.tobytes())
+        h.update(operand.values.tobytes())
+    else:
+        h.update(repr(operand).encode())
+    return h.digest()
+
+
+def key_for(operation: str, *operands) -> str:
+    """Cache key of an operation applied to the given operands."""
+    h = hashlib.blake2b(operation.encode(), digest_size=16)
+    for operand in operands:
+        h.update(fingerprint(operand))
+    return h.hexdigest()
+
+
+def _protect(value):
+    # results that can be changed in place are copied, everything else is immutable
+    if isinstance(value, Matrix):
+        return value.copy()
+    if isinstance(value, SparseMatrix):
+        return SparseMatrix._from_csr(value.rows, value.cols, value.indptr[:], value.indices[:], value.values[:])
+    return value
+
+
+def size_of(value) -> int:
+    """Approximate memory used by a cached value, in bytes."""
+    if isinstance(value, Matrix):
+        return sys.getsizeof(value) + value.rows * value.cols * 8
+    if isinstance(value, SparseMatrix):
+        return sys.getsizeof(value) + len(value.indptr) * 8 + value.nnz * 16
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """LRU cache bounded by max_entries and max_bytes, with an optional on-disk tier."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, directory: str = None, max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = None
+        if directory is not None:
+            self.directory = os.path.expanduser(directory)
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+        self.entries = OrderedDict()    # key -> (value, size), least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries or (self.directory is not None and os.path.exists(self._path(key)))
+
+    def get(self, key: str, default=None):
+        """Returns a (copy of the) cached value, or default on a miss."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return _protect(self.entries[key][0])
+
+        if self.directory is not None:
+            value = self._disk_get(key)
+            if value is not None:
+                self.disk_hits += 1
+                self._store(key, value)
+                return _protect(value)
+
+        self.misses += 1
+        return default
+
+    def put(self, key: str, value):
+        """Stores a copy of value under key, evicting the least recently used entries if needed."""
+        value = _protect(value)
+        self._store(key, value)
+        if self.directory is not None:
+            self._disk_put(key, value)
+
+    def compute(self, operand, operation: str):
+        """Runs operation (one of OPERATIONS) on operand, or returns the cached result."""
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{operation}', available: {', '.join(OPERATIONS)}")
+        key = key_for(operation, operand)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = getattr(operand, operation)()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Empties the cache, the disk tier included."""
+        self.entries.clear()
+        self.bytes = 0
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(DISK_SUFFIX):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _store(self, key, value):
+        size = size_of(value)
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            # would evict everything else and still not fit
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + DISK_SUFFIX)
+
+    def _disk_get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = _decode(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # truncated, corrupt or from an incompatible version: drop it, it's a miss
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        # the modification time doubles as the last access time for disk eviction
+        os.utime(path)
+        return value
+
+    def _disk_put(self, key, value):
+        data = _encode(value)
+        if data is None:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+        self._disk_evict()
+
+    def _disk_evict(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(DISK_SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+
+def _little_endian(values) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _encode(value):
+    """Disk tier bytes of a number, Matrix or SparseMatrix, None for anything else."""
+    if isinstance(value, float):
+        return DISK_HEADER.pack(DISK_MAGIC, NUMBER, 0, 0, 1) + _little_endian(array('d', [value]))
+    if isinstance(value, Matrix):
+        flat = value._flat()
+        return DISK_HEADER.pack(DISK_MAGIC, DENSE, value.rows, value.cols, len(flat)) + _little_endian(flat)
+    if isinstance(value, SparseMatrix):
+        return (DISK_HEADER.pack(DISK_MAGIC, SPARSE, value.rows, value.cols, value.nnz) + _little_endian(value.indptr)
+                + _little_endian(value.indices) + _little_endian(value.values))
+    return None
+
+
+def _decode(data: bytes):
+    """Inverse of _encode, raises ValueError for anything it did not write."""
+    if len(data) < DISK_HEADER.size:
+        raise ValueError("Cache file is truncated")
+    magic, kind, rows, cols, count = DISK_HEADER.unpack_from(data)
+    body = data[DISK_HEADER.size:]
+
+    if magic != DISK_MAGIC:
+        raise ValueError("Not a cache file")
+    if kind == NUMBER and count == 1 and len(body) == 8:
+        return _from_little_endian('d', body)[0]
+    if kind == DENSE and rows and cols and count == rows * cols and len(body) == 8 * count:
+        return Matrix._from_buffer(_from_little_endian('d', body), rows, cols)
+    if kind == SPARSE and rows and cols and len(body) == 8 * (rows + 1 + 2 * count):
+        indptr_end = 8 * (rows + 1)
+        indices_end = indptr_end + 8 * count
+        indptr = _from_little_endian('q', body[:indptr_end])
+        indices = _from_little_endian('q', body[indptr_end:indices_end])
+        if (indptr[0] != 0 or indptr[-1] != count or any(a > b for a, b in zip(indptr, indptr[1:]))
+                or any(not 0 <= j < cols for j in indices)):
+            raise ValueError("Corrupt cache file")
+        return SparseMatrix._from_csr(rows, cols, indptr, indices, _from_little_endian('d', body[indices_end:]))
+    raise ValueError("Corrupt cache file")
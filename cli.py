@@ -0,0 +1,192 @@
+"""
+Headless batch mode.
+
+Reads jobs as JSON Lines from a file (or stdin), runs them through Matrix on a
+pool of worker processes and writes one JSON line per result as soon as it is
+done (results can therefore come out of input order, use "id" to match them).
+
+    {"id": 1, "op": "det", "a": [[1, 2], [3, 4]]}
+    {"id": 2, "op": "mul", "a": "1, 2\\n3, 4", "b": [[5], [6]]}
+
+"op" is one of det, inv, rref, tra, add, sub, mul. Operands are lists of rows
+or text in the calculator's input format. Only a bounded number of jobs is in
+flight at once, so memory does not grow with the size of the input.
+
+    python cli.py jobs.jsonl -o results.jsonl --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from math import isfinite
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import profiling
+from matrix import Matrix
+from operations import BINARY_OPERATIONS, UNARY_OPERATIONS, build_matrix, compute, parse_matrix
+from sparse import SparseMatrix
+
+
+def load_operand(value, matrix_name: str):
+    """Operands go through the same parsing and validation as the GUI input."""
+    if isinstance(value, str):
+        return parse_matrix(value, matrix_name)
+    if isinstance(value, list) and all(isinstance(row, list) for row in value):
+        return build_matrix(value, matrix_name)
+    raise ValueError(f"{matrix_name} must be a list of rows or comma-separated text")
+
+
+def to_json(result):
+    """JSON-ready form of a result. JSON has no Infinity or NaN, results with them are errors."""
+    if isinstance(result, (Matrix, SparseMatrix)):
+        if isinstance(result, SparseMatrix):
+            result = result.to_dense()
+        values = result._flat()
+    else:
+        values = [result]
+    if not all(map(isfinite, values)):
+        raise ValueError("The result has infinite or NaN entries (overflow or invalid input), JSON cannot represent them")
+    return result.data if isinstance(result, Matrix) else result
+
+
+def _echo(value):
+    # id and op are copied back into the record as given, but NaN and Infinity
+    # (which json.loads accepts) can't be written out, those are echoed as text
+    try:
+        json.dumps(value, allow_nan=False)
+    except ValueError:
+        return repr(value)
+    return value
+
+
+def run_job(line_number: int, line: str) -> dict:
+    """Parses and runs one job, returns the JSON-ready result record (never raises)."""
+    start = time.perf_counter()
+    record = {'line': line_number}
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("A job must be a JSON object")
+        record['id'] = _echo(job.get('id', line_number))
+        operation = job.get('op')
+        record['op'] = _echo(operation)
+        if operation not in UNARY_OPERATIONS + BINARY_OPERATIONS:
+            raise ValueError(f"Unknown operation '{operation}'")
+
+        matrix_a = load_operand(job.get('a'), "Matrix A")
+        matrix_b = load_operand(job.get('b'), "Matrix B") if operation in BINARY_OPERATIONS else None
+
+        record['result'] = to_json(compute(operation, matrix_a, matrix_b))
+        record['status'] = 'ok'
+    except ValueError as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"An unexpected error occurred: {e}"
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+
+def _profiled_job(line_number: int, line: str):
+    # run_job with its own profiler, returns (record, profiling report)
+    profiler = profiling.enable()
+    try:
+        record = run_job(line_number, line)
+    finally:
+        profiling.disable(profiler)
+    return record, profiler.report()
+
+
+def read_jobs(stream):
+    # (line number, text) of every non-blank line, read lazily
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def run_batch(stream, output, workers: int = 1, max_in_flight: int = None, profiler=None) -> dict:
+    """
+    Runs every job of stream and writes the results to output as they finish.
+    Returns a summary with the number of jobs, failures, total time and throughput.
+    With a profiler, the stats of every job (from whichever process ran it) are merged into it.
+    """
+    job = run_job if profiler is None else _profiled_job
+    max_in_flight = max_in_flight or 2 * workers
+    started = time.perf_counter()
+    done = failed = 0
+
+    def emit(result):
+        nonlocal done, failed
+        if profiler is None:
+            record = result
+        else:
+            record, report = result
+            profiler.merge(report)
+        done += 1
+        failed += record['status'] != 'ok'
+        output.write(json.dumps(record, allow_nan=False) + '\n')
+        output.flush()
+
+    if workers <= 1:
+        for line_number, line in read_jobs(stream):
+            emit(job(line_number, line))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = set()
+            jobs = read_jobs(stream)
+            for line_number, line in jobs:
+                in_flight.add(pool.submit(job, line_number, line))
+                if len(in_flight) >= max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        emit(future.result())
+            for future in _as_finished(in_flight):
+                emit(future.result())
+
+    elapsed = time.perf_counter() - started
+    return {
+        'jobs': done,
+        'failed': failed,
+        'seconds': elapsed,
+        'jobs_per_second': done / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def _as_finished(futures):
+    pending = set(futures)
+    while pending:
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        yield from finished
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run matrix jobs (JSON Lines) without the GUI.')
+    parser.add_argument('input', nargs='?', default='-', help="jobs file, '-' for stdin (default)")
+    parser.add_argument('--output', '-o', default='-', help="results file, '-' for stdout (default)")
+    parser.add_argument('--workers', '-w', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    parser.add_argument('--max-in-flight', type=int, default=None, help='jobs submitted but not written yet (default: 2 x workers)')
+    args = parser.parse_args(argv)
+    # MATRIX_PROFILE=1 collects the stats of all jobs, the report goes to stderr
+    profiler = profiling.Profiler() if profiling.requested() else None
+
+    stream = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        summary = run_batch(stream, output, args.workers, args.max_in_flight, profiler)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"{summary['jobs']} jobs ({summary['failed']} failed) in {summary['seconds']:.3f} s, "
+          f"{summary['jobs_per_second']:.1f} jobs/s", file=sys.stderr)
+    if profiler is not None:
+        print(profiler.format_report(), file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Iterative solvers for large square systems A x = b.
+
+Instead of eliminating, the solvers only multiply A by vectors, so an
+iteration costs O(nnz) for a SparseMatrix (O(n^2) for a dense Matrix) and no
+matrix-sized memory is allocated. Besides Matrix and SparseMatrix, A can be
+any object with a matvec(x) method (rows and cols are checked when present),
+for example a LinearOperator wrapping a function, so structured operators are
+never built as matrices.
+
+    x, info = cg(A, b, tol=1e-10)
+    x, info = gmres(A, b, x0=x, restart=30, M=jacobi_preconditioner(A))
+
+Every solver returns the solution as a list and an info dict with the number
+of iterations, the final residual ||b - A x|| / ||b|| and whether it reached
+tol. Not converging within maxiter is reported in info, not raised.
+"""
+from math import hypot, sqrt
+
+from matrix import Matrix
+from sparse import SparseMatrix
+
+
+class LinearOperator:
+    '''Matrix-free rows x cols operator, x -> A x is computed by a function.'''
+
+    def __init__(self, rows: int, cols: int, matvec, diagonal=None):
+        # matvec: function taking a list of cols floats and returning a list of rows floats
+        # diagonal: entries (i, i) of the operator, only needed for Jacobi
+        self.rows = rows
+        self.cols = cols
+        self._matvec = matvec
+        self._diagonal = diagonal
+
+    def matvec(self, x):
+        return self._matvec(x)
+
+    def diagonal(self):
+        if self._diagonal is None:
+            raise ValueError("The operator has no diagonal")
+        return list(self._diagonal)
+
+
+def _dot(x, y):
+    return sum(a * b for a, b in zip(x, y))
+
+
+def _norm(x):
+    return sqrt(_dot(x, x))
+
+
+def _residual(A, b, x):
+    return [bi - ai for bi, ai in zip(b, A.matvec(x))]
+
+
+def _start(A, b, x0):
+    # Validated float copies of b and of the starting guess (zeros without x0)
+    b = [float(v) for v in b]
+    n = len(b)
+    if not n:
+        raise ValueError("Right-hand side cannot be empty")
+    if getattr(A, 'rows', n) != getattr(A, 'cols', n):
+        raise ValueError("Iterative solvers need a square matrix")
+    if getattr(A, 'rows', n) != n:
+        raise ValueError("Right-hand side must have as many entries as the matrix has rows")
+    if x0 is None:
+        return b, [0.0] * n
+    x = [float(v) for v in x0]
+    if len(x) != n:
+        raise ValueError("Starting guess must have as many entries as the right-hand side")
+    return b, x
+
+
+def _inverse_diagonal(A):
+    d = A.diagonal()
+    if any(v == 0 for v in d):
+        raise ValueError("The diagonal of the matrix has zeros")
+    return [1.0 / v for v in d]
+
+
+def _row_entries(A):
+    # (columns, values) of the entries of every row, for the sweeps that go row by row
+    if isinstance(A, Matrix):
+        columns = range(A.cols)
+        return [(columns, row) for row in A._rows()]
+    if isinstance(A, SparseMatrix):
+        entries = []
+        for i in range(A.rows):
+            start, stop = A.indptr[i], A.indptr[i + 1]
+            entries.append((A.indices[start:stop].tolist(), A.values[start:stop].tolist()))
+        return entries
+    raise ValueError("Gauss-Seidel and SSOR need the entries, A must be a Matrix or SparseMatrix")
+
+
+def jacobi_preconditioner(A):
+    """M^-1 r = D^-1 r with D the diagonal of A. Works for any operator that has a diagonal."""
+    inverse = _inverse_diagonal(A)
+    return lambda r: [a * b for a, b in zip(inverse, r)]
+
+
+def ssor_preconditioner(A, omega: float = 1.0):
+    """
+    Symmetric successive over-relaxation: one forward and one backward sweep per
+    application. Stays symmetric positive definite for SPD A and 0 < omega < 2,
+    so it can be used with cg (omega=1 is symmetric Gauss-Seidel).
+    """
+    if not 0 < omega < 2:
+        raise ValueError("omega must be between 0 and 2")
+    rows = _row_entries(A)
+    scaled = [v / omega for v in A.diagonal()]
+    if any(v == 0 for v in scaled):
+        raise ValueError("The diagonal of the matrix has zeros")
+    lower = [[(j, v) for j, v in zip(*row) if j < i] for i, row in enumerate(rows)]
+    upper = [[(j, v) for j, v in zip(*row) if j > i] for i, row in enumerate(rows)]
+    factor = (2 - omega) / omega
+
+    def apply(r):
+        # (2 - w) / w * (D/w + U)^-1 (D/w) (D/w + L)^-1 r
+        n = len(r)
+        y = [0.0] * n
+        for i in range(n):
+            y[i] = (r[i] - sum(v * y[j] for j, v in lower[i])) / scaled[i]
+        y = [factor * d * v for d, v in zip(scaled, y)]
+        z = [0.0] * n
+        for i in range(n - 1, -1, -1):
+            z[i] = (y[i] - sum(v * z[j] for j, v in upper[i])) / scaled[i]
+        return z
+
+    return apply
+
+
+def cg(A, b, x0=None, tol: float = 1e-8, maxiter: int = 1000, M=None):
+    """
+    Conjugate gradient for symmetric positive definite A. M is an optional
+    preconditioner, a function r -> M^-1 r that must be SPD as well.
+    """
+    b, x = _start(A, b, x0)
+    b_norm = _norm(b) or 1.0
+    r = _residual(A, b, x)
+    z = M(r) if M else r
+    p = list(z)
+    rz = _dot(r, z)
+    residual = _norm(r) / b_norm
+
+    iterations = 0
+    while residual > tol and iterations < maxiter:
+        Ap = A.matvec(p)
+        pAp = _dot(p, Ap)
+        if pAp <= 0:
+            raise ValueError("Matrix is not positive definite, use gmres instead")
+        alpha = rz / pAp
+        x = [xi + alpha * pi for xi, pi in zip(x, p)]
+        r = [ri - alpha * api for ri, api in zip(r, Ap)]
+        iterations += 1
+
+        residual = _norm(r) / b_norm
+        z = M(r) if M else r
+        rz, previous = _dot(r, z), rz
+        beta = rz / previous
+        p = [zi + beta * pi for zi, pi in zip(z, p)]
+
+    return x, {'iterations': iterations, 'residual': residual, 'converged': residual <= tol}
+
+
+def gmres(A, b, x0=None, tol: float = 1e-8, maxiter: int = 1000, restart: int = 30, M=None):
+    """
+    Restarted GMRES for general (non-symmetric) A. Each cycle builds an Arnoldi
+    basis of up to restart vectors, so memory is O(restart * n). M is an optional
+    right preconditioner, a function r -> M^-1 r.
+    """
+    b, x = _start(A, b, x0)
+    b_norm = _norm(b) or 1.0
+    restart = max(1, min(restart, len(b)))
+
+    iterations = 0
+    while True:
+        r = _residual(A, b, x)
+        beta = _norm(r)
+        residual = beta / b_norm
+        if residual <= tol or iterations >= maxiter:
+            break
+
+        V = [[v / beta for v in r]]
+        Z = []       # preconditioned basis vectors, x is updated with these
+        R = []       # columns of the triangular factor of the Hessenberg matrix
+        cs, sn = [], []
+        g = [beta]   # rotated right-hand side, |g[-1]| is the current residual norm
+
+        for j in range(restart):
+            z = M(V[j]) if M else V[j]
+            Z.append(z)
+            w = A.matvec(z)
+
+            # modified Gram-Schmidt against the basis so far
+            h = []
+            for v in V:
+                hij = _dot(w, v)
+                w = [wi - hij * vi for wi, vi in zip(w, v)]
+                h.append(hij)
+            next_norm = _norm(w)
+            h.append(next_norm)
+
+            # previous Givens rotations, then the one that zeroes h[j + 1]
+            for i in range(j):
+                h[i], h[i + 1] = cs[i] * h[i] + sn[i] * h[i + 1], cs[i] * h[i + 1] - sn[i] * h[i]
+            d = hypot(h[j], h[j + 1])
+            if d == 0:
+                raise ValueError("Matrix is singular, GMRES broke down")
+            cs.append(h[j] / d)
+            sn.append(h[j + 1] / d)
+            h[j] = d
+            g.append(-sn[j] * g[j])
+            g[j] *= cs[j]
+            R.append(h[:j + 1])
+            iterations += 1
+
+            if next_norm == 0 or abs(g[j + 1]) / b_norm <= tol or iterations >= maxiter:
+                break
+            V.append([wi / next_norm for wi in w])
+
+        # solve the small triangular system and update x with the basis
+        k = len(R)
+        y = [0.0] * k
+        for i in range(k - 1, -1, -1):
+            y[i] = (g[i] - sum(R[l][i] * y[l] for l in range(i + 1, k))) / R[i][i]
+        for yi, z in zip(y, Z):
+            x = [xi + yi * zi for xi, zi in zip(x, z)]
+
+    return x, {'iterations': iterations, 'residual': residual, 'converged': residual <= tol}
+
+
+def jacobi(A, b, x0=None, tol: float = 1e-8, maxiter: int = 1000):
+    """
+    Jacobi iteration x += D^-1 (b - A x). Needs only matvec and the diagonal, and
+    converges for strictly diagonally dominant A.
+    """
+    b, x = _start(A, b, x0)
+    b_norm = _norm(b) or 1.0
+    inverse = _inverse_diagonal(A)
+
+    iterations = 0
+    while True:
+        r = _residual(A, b, x)
+        residual = _norm(r) / b_norm
+        if residual <= tol or iterations >= maxiter:
+            break
+        x = [xi + di * ri for xi, di, ri in zip(x, inverse, r)]
+        iterations += 1
+
+    return x, {'iterations': iterations, 'residual': residual, 'converged': residual <= tol}
+
+
+def gauss_seidel(A, b, x0=None, tol: float = 1e-8, maxiter: int = 1000):
+    """
+    Gauss-Seidel sweeps, using every new entry of x as soon as it is computed.
+    Needs the entries (A a Matrix or SparseMatrix), converges for strictly diagonally
+    dominant or symmetric positive definite A.
+    """
+    b, x = _start(A, b, x0)
+    b_norm = _norm(b) or 1.0
+    rows = _row_entries(A)
+    diagonal = A.diagonal()
+    if any(v == 0 for v in diagonal):
+        raise ValueError("The diagonal of the matrix has zeros")
+
+    iterations = 0
+    while True:
+        residual = _norm(_residual(A, b, x)) / b_norm
+        if residual <= tol or iterations >= maxiter:
+            break
+        for i, (columns, values) in enumerate(rows):
+            s = b[i] - sum(v * x[j] for j, v in zip(columns, values))
+            x[i] += s / diagonal[i]
+        iterations += 1
+
+    return x, {'iterations': iterations, 'residual': residual, 'converged': residual <= tol}
@@ -0,0 +1,236 @@
+"""
+Lazy Matrix expressions.
+
+Operators on a LazyMatrix build an expression tree instead of computing right
+away. evaluate() then:
+
+- multiplies every chain A * B * C ... in the cheapest order for the shapes
+  (matrix-chain dynamic programming),
+- fuses sums, differences, negations and scalar multiples into one pass over
+  the operands, without intermediate matrices,
+- computes identical subexpressions only once.
+
+    expr = A.lazy() * B * C + D - 2 * E.lazy()
+    result = expr.evaluate()
+"""
+import operator
+from array import array
+
+from matrix import Matrix
+
+
+class LazyMatrix:
+    # op is 'leaf', 'add', 'sub', 'neg', 'scale' or 'matmul'. key identifies the
+    # expression structurally, so equal subexpressions are recognised and shared.
+    __slots__ = ('op', 'children', 'scalar', 'matrix', 'rows', 'cols', 'key')
+
+    def __init__(self, matrix: Matrix):
+        if not isinstance(matrix, Matrix):
+            raise ValueError("Only a Matrix can be made lazy")
+        self.op = 'leaf'
+        self.children = ()
+        self.scalar = None
+        self.matrix = matrix
+        self.rows = matrix.rows
+        self.cols = matrix.cols
+        self.key = ('leaf', id(matrix))
+
+    @classmethod
+    def _node(cls, op, children, rows, cols, scalar=None):
+        node = object.__new__(cls)
+        node.op = op
+        node.children = children
+        node.scalar = scalar
+        node.matrix = None
+        node.rows = rows
+        node.cols = cols
+        node.key = (op, scalar) + tuple(child.key for child in children)
+        return node
+
+    def __repr__(self):
+        if self.op == 'leaf':
+            return f"Matrix({self.rows}x{self.cols})"
+        if self.op == 'neg':
+            return f"-{self.children[0]!r}"
+        if self.op == 'scale':
+            return f"{self.scalar} * {self.children[0]!r}"
+        symbol = {'add': '+', 'sub': '-', 'matmul': '*'}[self.op]
+        return f"({self.children[0]!r} {symbol} {self.children[1]!r})"
+
+    def __add__(self, other):
+        other = _wrap(other)
+        if other is None:
+            return NotImplemented
+        if self.rows != other.rows or self.cols != other.cols:
+            raise ValueError("Matrices must have the same dimensions to add")
+        return LazyMatrix._node('add', (self, other), self.rows, self.cols)
+
+    def __radd__(self, other):
+        other = _wrap(other)
+        if other is None:
+            return NotImplemented
+        return other.__add__(self)
+
+    def __sub__(self, other):
+        other = _wrap(other)
+        if other is None:
+            return NotImplemented
+        if self.rows != other.rows or self.cols != other.cols:
+            raise ValueError("Matrices must have the same dimensions to subtract")
+        return LazyMatrix._node('sub', (self, other), self.rows, self.cols)
+
+    def __rsub__(self, other):
+        other = _wrap(other)
+        if other is None:
+            return NotImplemented
+        return other.__sub__(self)
+
+    def __neg__(self):
+        return LazyMatrix._node('neg', (self,), self.rows, self.cols)
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return LazyMatrix._node('scale', (self,), self.rows, self.cols, float(other))
+        other = _wrap(other)
+        if other is None:
+            return NotImplemented
+        if self.cols != other.rows:
+            raise ValueError("Number of columns in the first matrix must equal number of rows in the second matrix")
+        return LazyMatrix._node('matmul', (self, other), self.rows, other.cols)
+
+    def __rmul__(self, other):
+        if isinstance(other, (int, float)):
+            return self.__mul__(other)
+        other = _wrap(other)
+        if other is None:
+            return NotImplemented
+        return other.__mul__(self)
+
+    def __truediv__(self, k):
+        if not isinstance(k, (int, float)):
+            return NotImplemented
+        return self.__mul__(1.0 / k)
+
+    def evaluate(self) -> Matrix:
+        """Computes the expression and returns the resulting Matrix."""
+        return _Evaluator().value(self)
+
+
+def _wrap(other):
+    if isinstance(other, LazyMatrix):
+        return other
+    if isinstance(other, Matrix):
+        return LazyMatrix(other)
+    return None
+
+
+def chain_order(dims: list) -> tuple:
+    """
+    Matrix-chain multiplication order for factors of shapes dims[i] x dims[i + 1].
+    Returns (cost, split) where cost is the minimal number of scalar multiplications
+    and split[i][j] is where the product of factors i..j is best split.
+    """
+    n = len(dims) - 1
+    cost = [[0] * n for _ in range(n)]
+    split = [[0] * n for _ in range(n)]
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            j = i + length - 1
+            best = None
+            for k in range(i, j):
+                c = cost[i][k] + cost[k + 1][j] + dims[i] * dims[k + 1] * dims[j + 1]
+                if best is None or c < best:
+                    best = c
+                    split[i][j] = k
+            cost[i][j] = best
+    return cost[0][n - 1], split
+
+
+class _Evaluator:
+    # Evaluates one expression tree, remembering the result of every key it computes
+
+    def __init__(self):
+        self.memo = {}
+
+    def value(self, node: LazyMatrix) -> Matrix:
+        if node.key in self.memo:
+            return self.memo[node.key]
+
+        if node.op == 'leaf':
+            result = node.matrix
+        elif node.op == 'matmul':
+            factors = []
+            self._chain(node, factors)
+            result = self._multiply_chain(factors)
+        else:
+            terms = {}
+            self._linear_terms(node, 1.0, terms)
+            result = self._fused(list(terms.values()), node.rows, node.cols)
+
+        self.memo[node.key] = result
+        return result
+
+    def _chain(self, node, factors):
+        # flatten nested products into their list of factors
+        if node.op == 'matmul':
+            for child in node.children:
+                self._chain(child, factors)
+        else:
+            factors.append(node)
+
+    def _multiply_chain(self, factors):
+        dims = [factors[0].rows] + [f.cols for f in factors]
+        _, split = chain_order(dims)
+        keys = [f.key for f in factors]
+
+        def product(i, j):
+            if i == j:
+                return self.value(factors[i])
+            # the product of a run of factors is the same whatever the parenthesization
+            key = ('matmul',) + tuple(keys[i:j + 1])
+            if key not in self.memo:
+                k = split[i][j]
+                self.memo[key] = product(i, k) * product(k + 1, j)
+            return self.memo[key]
+
+        return product(0, len(factors) - 1)
+
+    def _linear_terms(self, node, coef, terms):
+        # write an elementwise expression as sum(coef * operand), merging equal operands
+        if node.op == 'add':
+            self._linear_terms(node.children[0], coef, terms)
+            self._linear_terms(node.children[1], coef, terms)
+        elif node.op == 'sub':
+            self._linear_terms(node.children[0], coef, terms)
+            self._linear_terms(node.children[1], -coef, terms)
+        elif node.op == 'neg':
+            self._linear_terms(node.children[0], -coef, terms)
+        elif node.op == 'scale':
+            self._linear_terms(node.children[0], coef * node.scalar, terms)
+        else:
+            previous = terms.get(node.key, (0.0, node))[0]
+            terms[node.key] = (previous + coef, node)
+
+    def _fused(self, terms, rows, cols):
+        # one pass over all the operands at once, no intermediate matrices
+        terms = [(c, n) for c, n in terms if c != 0]
+        if not terms:
+            return Matrix._from_buffer(array('d', bytes(8 * rows * cols)), rows, cols)
+
+        coefs = [c for c, _ in terms]
+        flats = [self.value(n)._flat() for _, n in terms]
+
+        if len(terms) == 1:
+            c, = coefs
+            result = array('d', [c * x for x in flats[0]])
+        elif len(terms) == 2 and coefs == [1.0, 1.0]:
+            result = array('d', map(operator.add, *flats))
+        elif len(terms) == 2 and coefs == [1.0, -1.0]:
+            result = array('d', map(operator.sub, *flats))
+        elif len(terms) == 2:
+            c0, c1 = coefs
+            result = array('d', [c0 * x + c1 * y for x, y in zip(*flats)])
+        else:
+            result = array('d', [sum(map(operator.mul, coefs, values)) for values in zip(*flats)])
+
+        return Matrix._from_buffer(result, rows, cols)
@@ -1,4 +1,37 @@
-class Matrix: 
+import sys
+from array import array
+
+from backends import get_backend
+
+# machine epsilon, used to decide when a pivot is numerically zero
+EPSILON = sys.float_info.epsilon
+
+# Low-rank updates keep the cached inverse and LU factorization up to date only while they
+# lose at most about half of the digits (error growth below this), and for at most
+# REFACTOR_AFTER updates in a row. Past that the caches are dropped and the matrix is
+# factored from scratch when it is next needed.
+UPDATE_GROWTH_LIMIT = 1 / EPSILON ** 0.5
+REFACTOR_AFTER = 50
+
+
+class Matrix:
+    # Elements live in one flat array('d') buffer. Element (i, j) is stored at
+    # _buf[_offset + i * _rstride + j * _cstride], so transposes, row slices and
+    # submatrices can be views that share the buffer of the matrix they came from.
+    # All of them also share _writes, a counter bumped by every write to the buffer, so
+    # the cached factorizations of a view are dropped when the elements change through
+    # another one (_seen is the count the caches were computed at).
+    __slots__ = ('rows', 'cols', '_buf', '_offset', '_rstride', '_cstride', '_writes', '_seen', '_lu', '_update', '_qr', '_inv')
+
+    # Compute backend doing the arithmetic, NumPy when it is installed, pure Python otherwise
+    _backend = get_backend()
+
+    @classmethod
+    def use_backend(cls, backend=None):
+        # Select the backend by name ('python', 'numpy'), by instance, or None for the default
+        cls._backend = get_backend(backend)
+        return cls._backend
+
     def __init__(self, data: list[list[float]]):
         if not data or not data[0]:
             raise ValueError("Matrix cannot be empty")
@@ -7,160 +40,809 @@ class Matrix:
         for row in data:
             if len(row) != self.cols:
                 raise ValueError("All rows must have the same number of columns")
-        self.data = [[float(x) for x in row] for row in data]
+        # float() like before, so numeric strings are accepted and bad elements raise ValueError
+        self._buf = array('d')
+        for row in data:
+            self._buf.extend(map(float, row))
+        self._offset = 0
+        self._rstride = self.cols
+        self._cstride = 1
+        self._writes = [0]
+        self._seen = 0
+        # Cached LU factorization (shared by det, inverse and solve)
+        self._lu = None
+        # Low-rank updates applied on top of _lu (see _extend_update)
+        self._update = None
+        # Cached QR factorization (least-squares solve of non-square systems)
+        self._qr = None
+        # Cached inverse (row-major array, number of low-rank updates applied since it was computed)
+        self._inv = None
+
+    @classmethod
+    def _from_buffer(cls, buf, rows, cols, offset=0, rstride=None, cstride=1, writes=None):
+        # Fast constructor for internally produced results: no validation, no copy.
+        # Views pass the _writes counter of the matrix whose buffer they share.
+        m = object.__new__(cls)
+        m.rows = rows
+        m.cols = cols
+        m._buf = buf
+        m._offset = offset
+        m._rstride = cols if rstride is None else rstride
+        m._cstride = cstride
+        m._writes = [0] if writes is None else writes
+        m._seen = m._writes[0]
+        m._lu = None
+        m._update = None
+        m._qr = None
+        m._inv = None
+        return m
+
+    def _is_compact(self):
+        # True when the buffer holds exactly this matrix in row-major order
+        return (self._offset == 0 and self._cstride == 1 and self._rstride == self.cols
+                and len(self._buf) == self.rows * self.cols)
+
+    def _flat(self):
+        # Row-major array of the elements, the buffer itself when no copy is needed
+        if self._is_compact():
+            return self._buf
+        buf, o, rs, cs = self._buf, self._offset, self._rstride, self._cstride
+        flat = array('d')
+        for i in range(self.rows):
+            start = o + i * rs
+            flat.extend(buf[start:start + self.cols * cs:cs] if cs > 0 else
+                        [buf[start + j * cs] for j in range(self.cols)])
+        return flat
+
+    def _rows(self):
+        # Fresh list of row lists, for algorithms that work row by row
+        flat = self._flat()
+        c = self.cols
+        return [flat[i * c:(i + 1) * c].tolist() for i in range(self.rows)]
+
+    def _check_writable(self):
+        # In-place operations can't write to a read-only memory-mapped file
+        if getattr(self._buf, 'readonly', False):
+            raise ValueError("Matrix is memory-mapped read-only, load it with writable=True to change it")
+
+    def _assign(self, flat):
+        # Write row-major values into this matrix (and every view sharing its buffer)
+        self._check_writable()
+        buf, o, rs, cs = self._buf, self._offset, self._rstride, self._cstride
+        c = self.cols
+        for i in range(self.rows):
+            start = o + i * rs
+            for j in range(c):
+                buf[start + j * cs] = flat[i * c + j]
+        self._written()
+
+    def _written(self):
+        # Called after writing to the buffer: invalidates the caches of every view of it
+        self._writes[0] += 1
+        self._sync()
+
+    def _sync(self):
+        # Drop the cached factorizations if the buffer was written since they were computed
+        if self._seen != self._writes[0]:
+            self._seen = self._writes[0]
+            self._lu = None
+            self._update = None
+            self._qr = None
+            self._inv = None
+
+    @property
+    def data(self):
+        # Elements as a tuple of row tuples. Read-only, so that code which used to write
+        # through data (A.data[i][j] = x) fails loudly instead of changing a copy, rows
+        # and columns are changed with replace_row / replace_column
+        return tuple(map(tuple, self._rows()))
+
+    def copy(self):
+        # Compact copy that owns its own buffer
+        return Matrix._from_buffer(array('d', self._flat()), self.rows, self.cols)
+
+    def __getitem__(self, key):
+        # A[i, j] is an element, A[i] / A[i:j] are row views, A[r0:r1, c0:c1] is a submatrix view
+        if isinstance(key, tuple):
+            r, c = key
+            if isinstance(r, int) and isinstance(c, int):
+                if r < 0:
+                    r += self.rows
+                if c < 0:
+                    c += self.cols
+                if not (0 <= r < self.rows and 0 <= c < self.cols):
+                    raise IndexError("Matrix index out of range")
+                return self._buf[self._offset + r * self._rstride + c * self._cstride]
+        else:
+            r, c = key, slice(None)
+
+        if isinstance(r, int):
+            if r < 0:
+                r += self.rows
+            if not 0 <= r < self.rows:
+                raise IndexError("Matrix index out of range")
+            r = slice(r, r + 1)
+        if isinstance(c, int):
+            if c < 0:
+                c += self.cols
+            if not 0 <= c < self.cols:
+                raise IndexError("Matrix index out of range")
+            c = slice(c, c + 1)
+
+        r0, r1, rstep = r.indices(self.rows)
+        c0, c1, cstep = c.indices(self.cols)
+        rows = len(range(r0, r1, rstep))
+        cols = len(range(c0, c1, cstep))
+        if rows == 0 or cols == 0:
+            raise ValueError("Matrix cannot be empty")
+
+        return Matrix._from_buffer(self._buf, rows, cols,
+                                   self._offset + r0 * self._rstride + c0 * self._cstride,
+                                   self._rstride * rstep, self._cstride * cstep, self._writes)
+
+    def row(self, i):
+        # View of row i as a 1 x cols matrix
+        return self[i]
+
+    def submatrix(self, row_start, row_stop, col_start, col_stop):
+        # View of rows [row_start, row_stop) and columns [col_start, col_stop)
+        return self[row_start:row_stop, col_start:col_stop]
+
+    def __reduce__(self):
+        # Pickle only the elements (compacted), views and memory-mapped buffers included
+        return (Matrix._from_buffer, (array('d', self._flat()), self.rows, self.cols))
+
+    def save(self, path):
+        # Write the matrix to a binary file (see matrixio for the format)
+        import matrixio
+        matrixio.save(self, path)
+
+    @staticmethod
+    def load(path, mmap=False, writable=False):
+        # Read a matrix written by save(), mmap=True maps the file instead of reading it
+        import matrixio
+        return matrixio.load(path, mmap, writable)
+
+    @staticmethod
+    def from_csv(path, delimiter=','):
+        # Import a comma-separated text file (one row per line)
+        import matrixio
+        return matrixio.read_csv(path, delimiter)
+
+    def lazy(self):
+        # Lazy version of this matrix: operators build an expression, evaluate() computes it
+        from lazy import LazyMatrix
+        return LazyMatrix(self)
+
+    def format_cells(self, row_start=0, row_stop=None, col_start=0, col_stop=None, precision=2):
+        # Formatted text of the cells in a window of rows and columns, only those cells are touched
+        row_start, col_start = max(row_start, 0), max(col_start, 0)
+        row_stop = self.rows if row_stop is None else min(row_stop, self.rows)
+        col_stop = self.cols if col_stop is None else min(col_stop, self.cols)
+        if row_stop <= row_start or col_stop <= col_start:
+            return []
+        window = self[row_start:row_stop, col_start:col_stop]
+        return [[f"{x:.{precision}f}" for x in row] for row in window._rows()]
+
+    def iter_lines(self, precision=2):
+        # The rows of __str__, one at a time, so big matrices can be streamed out
+        c = self.cols
+        for i in range(self.rows):
+            row = self[i]._flat() if not self._is_compact() else self._buf[i * c:(i + 1) * c]
+            yield ' '.join(f"{x:.{precision}f}" for x in row)
+
+    def format_window(self, row_start=0, row_stop=None, col_start=0, col_stop=None, precision=2):
+        # Text of a window of rows and columns, laid out like __str__
+        return '\n'.join(' '.join(row) for row in self.format_cells(row_start, row_stop, col_start, col_stop, precision))
+
+    def summary(self, edge=3, precision=2):
+        # Text with only the first and last `edge` rows and columns, the rest shown as ...
+        def part(count):
+            if count <= 2 * edge:
+                return [(0, count)]
+            return [(0, edge), (count - edge, count)]
+
+        lines = []
+        row_parts, col_parts = part(self.rows), part(self.cols)
+        for n, (r0, r1) in enumerate(row_parts):
+            if n:
+                lines.append('...')
+            blocks = [self.format_cells(r0, r1, c0, c1, precision) for c0, c1 in col_parts]
+            for i in range(r1 - r0):
+                lines.append(' ... '.join(' '.join(block[i]) for block in blocks))
+        return '\n'.join(lines)
 
     def __str__(self):
-        return '\n'.join(' '.join(f"{x:.2f}" for x in row) for row in self.data)
-    
+        return '\n'.join(self.iter_lines())
+
     def __add__(self, other):
         # Add twp matrices (only possible for the same dimensions)
+        if not isinstance(other, Matrix):
+            return NotImplemented
+
         if self.rows != other.rows or self.cols != other.cols:
             raise ValueError("Matrices must have the same dimensions to add")
-        
-        result = [[self.data[i][j] + other.data[i][j] for j in range(self.cols)] for i in range(self.rows)]
-        
-        return Matrix(result)
-    
+
+        result = Matrix._backend.add(self._flat(), other._flat())
+
+        return Matrix._from_buffer(result, self.rows, self.cols)
+
     def __eq__(self, other):
         # Check if these goddamn matrices are equal
+        if not isinstance(other, Matrix):
+            return NotImplemented
+
         if self.rows != other.rows or self.cols != other.cols:
             return False
-        
-        for i in range(self.rows):
-            for j in range(self.cols):
-                if self.data[i][j] != other.data[i][j]:
-                    return False
-        
-        return True
-    
-    def __sub__(self, other): 
+
+        return self._flat() == other._flat()
+
+    def __sub__(self, other):
         # Subtract two calisse de matrices (only possible for the same dimensions)
         # checked online to make sure sub works
+        if not isinstance(other, Matrix):
+            return NotImplemented
+
         if self.rows != other.rows or self.cols != other.cols:
             raise ValueError("Matrices must have the same dimensions to subtract")
-        
-        result = [[self.data[i][j] - other.data[i][j] for j in range(self.cols)] for i in range(self.rows)]
-        
-        return Matrix(result)
+
+        result = Matrix._backend.sub(self._flat(), other._flat())
+
+        return Matrix._from_buffer(result, self.rows, self.cols)
 
     def __mul__(self, other):
         # Multiply two matrices (only possible if the number of columns in the first equals the number of rows in the second)
+        if not isinstance(other, Matrix):
+            return NotImplemented
+
         if self.cols != other.rows:
             raise ValueError("Number of columns in the first matrix must equal number of rows in the second matrix")
-        
-        result = [[0.0 for _ in range(other.cols)] for _ in range(self.rows)]
-        
-        for i in range(self.rows):
-            for j in range(other.cols):
-                for k in range(self.cols):
-                    result[i][j] += self.data[i][k] * other.data[k][j]
-        
-        return Matrix(result)
-    
+
+        result = Matrix._backend.matmul(self._flat(), other._flat(), self.rows, self.cols, other.cols)
+
+        return Matrix._from_buffer(result, self.rows, other.cols)
+
+    def matvec(self, x):
+        # Product with a vector (list of floats), the operation the iterative solvers are built on
+        if len(x) != self.cols:
+            raise ValueError("Vector must have as many entries as the matrix has columns")
+        flat, c = self._flat(), self.cols
+        return [sum(a * y for a, y in zip(flat[i * c:(i + 1) * c], x)) for i in range(self.rows)]
+
+    def diagonal(self):
+        # Entries (i, i) as a list
+        return [self[i, i] for i in range(min(self.rows, self.cols))]
+
     def transpose(self):
-        # Transpose the matrix
-        result = [[self.data[j][i] for j in range(self.rows)] for i in range(self.cols)]
-        return Matrix(result)
-    
+        # Transpose the matrix (a view: just swap the strides)
+        return Matrix._from_buffer(self._buf, self.cols, self.rows,
+                                   self._offset, self._cstride, self._rstride, self._writes)
+
+    def _lu_factor(self):
+        # LU decomposition with partial pivoting (Doolittle), computed once and cached.
+        # Returns (LU, perm, sign) where LU holds L below the diagonal (unit diagonal implied)
+        # and U on and above it, perm[i] is the original row now at position i and sign is
+        # the parity of the row swaps. While low-rank updates are pending (_update), this is
+        # the factorization of the matrix as it was before them.
+        self._sync()
+        if self._lu is not None:
+            return self._lu
+
+        if self.rows != self.cols:
+            raise ValueError("LU decomposition can only be calculated for square matrices")
+
+        n = self.rows
+        A = self._rows()
+        perm = list(range(n))
+        sign = 1.0
+
+        for k in range(n):
+            # pick the largest pivot in the column to keep the elimination stable
+            pivot = max(range(k, n), key=lambda i: abs(A[i][k]))
+            if A[pivot][k] == 0:
+                # whole column is already zero below the diagonal, nothing to eliminate
+                continue
+
+            if pivot != k:
+                A[k], A[pivot] = A[pivot], A[k]
+                perm[k], perm[pivot] = perm[pivot], perm[k]
+                sign = -sign
+
+            pivot_row = A[k]
+            pivot_value = pivot_row[k]
+            for i in range(k + 1, n):
+                row = A[i]
+                if row[k] == 0:
+                    continue
+                factor = row[k] / pivot_value
+                row[k] = factor
+                for j in range(k + 1, n):
+                    row[j] -= factor * pivot_row[j]
+
+        self._lu = (A, perm, sign)
+        return self._lu
+
+    def lu(self):
+        # LU decomposition with partial pivoting, returns (P, L, U) such that P * A = L * U
+        self._sync()
+        if self._update is not None:
+            # the triangles of the updated matrix are needed, factor it again
+            self._lu = self._update = None
+        LU, perm, _ = self._lu_factor()
+        n = self.rows
+
+        P = [[1.0 if j == perm[i] else 0.0 for j in range(n)] for i in range(n)]
+        L = [[LU[i][j] if j < i else (1.0 if j == i else 0.0) for j in range(n)] for i in range(n)]
+        U = [[LU[i][j] if j >= i else 0.0 for j in range(n)] for i in range(n)]
+
+        return Matrix(P), Matrix(L), Matrix(U)
+
     def det(self):
         # Calculate the determinant (only for square matrices)
         if self.rows != self.cols:
             raise ValueError("Determinant can only be calculated for square matrices")
-        
-        #if its a small matrix, calculate directly
-        if self.rows == 1:
-            return self.data[0][0]
-        
-        if self.rows == 2:
-            return self.data[0][0] * self.data[1][1] - self.data[0][1] * self.data[1][0]
-        
-        # if larger matrix, use Laplace expansion
-        determinant = 0.0
-        for c in range(self.cols):
-            minor = Matrix([row[:c] + row[c+1:] for row in self.data[1:]])
-            determinant += ((-1) ** c) * self.data[0][c] * minor.det()
-        
-        return determinant
-    
-    def inverse(self):
-        # Calculate the inverse (only for square matrices with non-zero determinant)
+
+        # det(A) = sign(P) * product of the diagonal of U, O(n^3) instead of Laplace's O(n!)
+        LU, _, sign = self._lu_factor()
+        determinant = sign
+        for i in range(self.rows):
+            determinant *= LU[i][i]
+        if self._update is not None:
+            # determinant lemma: det(A + U V^T) = det(A) det(I + V^T A^-1 U)
+            determinant *= self._update[3]
+
+        # adding 0.0 turns a -0.0 from a singular U back into a plain 0.0
+        return determinant + 0.0
+
+    def _lu_solve(self, b):
+        # Solve A x = b for a single right-hand side (list of floats) using the cached LU
+        # and the Woodbury correction of the low-rank updates since it was computed:
+        #   (A + U V^T)^-1 b = y - W C^-1 V^T y   with y = A^-1 b, W = A^-1 U
+        y = self._lu_substitute(b)
+        if self._update is not None:
+            W, V, C_inverse, _, _ = self._update
+            t = [sum(a * c for a, c in zip(v, y)) for v in V]
+            for row, w in zip(C_inverse, W):
+                f = sum(a * c for a, c in zip(row, t))
+                if f:
+                    y = [a - f * c for a, c in zip(y, w)]
+        return y
+
+    def _lu_substitute(self, b):
+        # Forward and back substitution with the cached LU factors only
+        LU, perm, _ = self._lu_factor()
+        n = self.rows
+
+        # forward substitution with the unit lower triangle, applying the row permutation
+        y = [b[perm[i]] for i in range(n)]
+        for i in range(n):
+            row = LU[i]
+            s = y[i]
+            for j in range(i):
+                s -= row[j] * y[j]
+            y[i] = s
+
+        # back substitution with the upper triangle
+        for i in range(n - 1, -1, -1):
+            row = LU[i]
+            s = y[i]
+            for j in range(i + 1, n):
+                s -= row[j] * y[j]
+            y[i] = s / row[i]
+
+        return y
+
+    def _lu_substitute_transpose(self, c):
+        # Solve A^T z = c with the cached LU factors: P A = L U, so A^T = U^T L^T P
+        LU, perm, _ = self._lu_factor()
+        n = self.rows
+
+        # forward substitution with U^T
+        w = list(c)
+        for i in range(n):
+            s = w[i]
+            for j in range(i):
+                s -= LU[j][i] * w[j]
+            w[i] = s / LU[i][i]
+
+        # back substitution with the unit upper triangle L^T
+        for i in range(n - 1, -1, -1):
+            s = w[i]
+            for j in range(i + 1, n):
+                s -= LU[j][i] * w[j]
+            w[i] = s
+
+        z = [0.0] * n
+        for i in range(n):
+            z[perm[i]] = w[i]
+        return z
+
+    def _inverse_norm_estimate(self):
+        # Hager's estimate of ||A^-1|| in the 1-norm (as in LAPACK's condition estimators):
+        # a few solves with A and A^T, O(n^2) instead of the O(n^3) of the whole inverse.
+        # It is a lower bound and almost always exact to within a small factor.
+        n = self.rows
+        x = [1.0 / n] * n
+        estimate = 0.0
+        previous = None
+        for _ in range(5):
+            y = self._lu_substitute(x)
+            estimate = max(estimate, sum(map(abs, y)))
+            z = self._lu_substitute_transpose([1.0 if v >= 0 else -1.0 for v in y])
+            j = max(range(n), key=lambda i: abs(z[i]))
+            if j == previous or abs(z[j]) <= sum(a * b for a, b in zip(z, x)):
+                break
+            x = [0.0] * n
+            x[j] = 1.0
+            previous = j
+
+        # Higham's extra test vector, catches the cases the iteration above underestimates
+        if n > 1:
+            b = [(-1) ** i * (1 + i / (n - 1)) for i in range(n)]
+            estimate = max(estimate, 2 * sum(map(abs, self._lu_substitute(b))) / (3 * n))
+        return estimate
+
+    def _check_invertible(self, message="Matrix is singular and cannot be inverted"):
+        # Raise if a pivot of U is negligible compared to the size of the entries of A
+        LU, _, _ = self._lu_factor()
+        if self._update is not None:
+            # the factorization was checked before the updates, and every update by _capacitance
+            return
+        scale = max(map(abs, self._flat()))
+        tol = self.rows * EPSILON * scale
+        for i in range(self.rows):
+            if abs(LU[i][i]) <= tol:
+                raise ValueError(message)
+
+    def norm1(self):
+        # Maximum absolute column sum (the matrix 1-norm)
+        return max(sum(map(abs, col)) for col in self.transpose()._rows())
+
+    def inverse(self, out=None):
+        # Calculate the inverse (only for square, non-singular matrices).
+        # If out is given, the inverse is written into that matrix instead of a new one.
         if self.rows != self.cols:
             raise ValueError("Inverse can only be calculated for square matrices")
-        
-        det = self.det()
-        if det == 0:
+
+        if out is not None and (out.rows != self.rows or out.cols != self.cols):
+            raise ValueError("Output matrix must have the same dimensions as the matrix")
+        if out is not None:
+            out._check_writable()
+
+        n = self.rows
+        if out is None:
+            return Matrix._from_buffer(array('d', self._inverse_data()), n, n)
+
+        self._sync()
+        if self._inv is not None:
+            out._assign(self._inv[0])
+            return out
+
+        # solve every column straight into out: no n x n temporary, and nothing is cached.
+        # The condition check uses an estimate of ||A^-1|| so that it runs before out (which
+        # may share the buffer of this matrix) is touched
+        if self._update is not None:
+            # the estimate needs the transposed solve, which the Woodbury terms don't have
+            self._lu = self._update = None
+        self._check_invertible()
+        if self.norm1() * self._inverse_norm_estimate() * EPSILON >= 1.0:
             raise ValueError("Matrix is singular and cannot be inverted")
-        
-        # Create the matrix of minors
-        minors = [[0.0 for _ in range(self.cols)] for _ in range(self.rows)]
-        for i in range(self.rows):
-            for j in range(self.cols):
-                minor = Matrix([row[:j] + row[j+1:] for k, row in enumerate(self.data) if k != i])
-                minors[i][j] = minor.det()
-        
-        # Create the matrix of cofactors
-        cofactors = [[((-1) ** (i + j)) * minors[i][j] for j in range(self.cols)] for i in range(self.rows)]
-        
-        # Transpose the cofactor matrix to get the adjugate
-        adjugate = Matrix(cofactors).transpose()
-        
-        # Divide each element by the determinant to get the inverse
-        inverse_data = [[adjugate.data[i][j] / det for j in range(adjugate.cols)] for i in range(adjugate.rows)]
-        
-        return Matrix(inverse_data)
-    
-    def rref(self):
-        # I love python and it's way of rounding numbers so that it returns a fuck ass -0.00
-        def clean(x, eps=1e-10):
-            return 0.0 if abs(x) < eps else x
-    
-        A = [[float(x) for x in row] for row in self.data]
-
-        r = 0
-
-        for c in range(self.cols):
-            pivot = None
-            for i in range(r, self.rows):
-                if A[i][c] != 0:
-                    pivot = i
-                    break
-                
-            if pivot is None:
+
+        # the LU is cached, so overwriting this matrix through out doesn't affect the solves
+        buf, o, rs, cs = out._buf, out._offset, out._rstride, out._cstride
+        for j in range(n):
+            e = [0.0] * n
+            e[j] = 1.0
+            column = self._lu_solve(e)
+            start = o + j * cs
+            for i, v in enumerate(column):
+                buf[start + i * rs] = v
+        out._written()
+        return out
+
+    def _inverse_data(self):
+        # Row-major array of the inverse, computed once by solving A x = e_j for every
+        # column of the identity with the cached LU factorization, then kept up to date
+        # by the low-rank updates
+        self._sync()
+        if self._inv is not None:
+            return self._inv[0]
+
+        self._check_invertible()
+
+        n = self.rows
+        inverse_data = array('d', bytes(8 * n * n))
+        for j in range(n):
+            e = [0.0] * n
+            e[j] = 1.0
+            column = self._lu_solve(e)
+            inverse_data[j::n] = array('d', column)
+
+        # condition number estimate in the 1-norm, an ill-conditioned matrix is singular
+        # for all practical purposes even if none of its pivots is exactly zero
+        inverse_norm = max(sum(map(abs, inverse_data[j::n])) for j in range(n))
+        if self.norm1() * inverse_norm * EPSILON >= 1.0:
+            raise ValueError("Matrix is singular and cannot be inverted")
+
+        self._inv = (inverse_data, 0)
+        return inverse_data
+
+    def _inv_solve(self, b):
+        # Solve A x = b for a single right-hand side with the cached inverse, x = A^-1 b
+        inv, n = self._inv[0], self.rows
+        return [sum(a * y for a, y in zip(inv[i * n:(i + 1) * n], b)) for i in range(n)]
+
+    def low_rank_update(self, U, V):
+        # A += U V^T in place, U is rows x k and V is cols x k (Matrix or list of rows).
+        # A cached inverse is updated with the Woodbury identity in O(n^2 k) instead of
+        # being recomputed in O(n^3):
+        #   (A + U V^T)^-1 = A^-1 - A^-1 U (I + V^T A^-1 U)^-1 V^T A^-1
+        # A cached LU factorization is kept, and the terms of the identity are stored next
+        # to it so solve() and det() stay O(n^2). Returns the matrix itself.
+        if not isinstance(U, Matrix):
+            U = Matrix(U)
+        if not isinstance(V, Matrix):
+            V = Matrix(V)
+        if U.rows != self.rows or V.rows != self.cols or U.cols != V.cols:
+            raise ValueError("U must have as many rows as the matrix, V as many rows as the matrix has columns, "
+                             "and both the same number of columns")
+        self._check_writable()
+
+        us = U.transpose()._rows()
+        vs = V.transpose()._rows()
+
+        self._sync()
+        cached = self._inv
+        lu, update = self._lu, self._update
+        if lu is not None and update is None:
+            # corrections are only worth keeping on top of an invertible matrix
+            try:
+                self._check_invertible()
+            except ValueError:
+                lu = None
+
+        buf, o, rs, cs = self._buf, self._offset, self._rstride, self._cstride
+        for u, v in zip(us, vs):
+            for i, ui in enumerate(u):
+                if ui:
+                    start = o + i * rs
+                    for j, vj in enumerate(v):
+                        buf[start + j * cs] += ui * vj
+        # drops the caches of this matrix and of every view sharing its buffer
+        self._written()
+
+        if cached is not None:
+            self._inv = self._woodbury(cached, us, vs)
+        if lu is not None:
+            self._lu = lu
+            self._update = self._extend_update(update, us, vs)
+            if self._update is None:
+                self._lu = None
+        return self
+
+    @staticmethod
+    def _capacitance(S):
+        # (C^-1, det C) of the capacitance matrix C = I + S, or None when the update it
+        # belongs to is not numerically safe. C is singular exactly when the updated matrix is,
+        # and cancellation in I + S (for k = 1: (1 + |s|) / |1 + s|) is the error growth.
+        k = len(S)
+        C = Matrix([[S[s][t] + (1.0 if s == t else 0.0) for t in range(k)] for s in range(k)])
+        try:
+            C_inverse = C.inverse()
+        except ValueError:
+            return None
+        if (1.0 + Matrix(S).norm1()) * C_inverse.norm1() > UPDATE_GROWTH_LIMIT:
+            return None
+        return C_inverse, C.det()
+
+    def _extend_update(self, update, us, vs):
+        # Woodbury terms for solving with the cached LU after adding the columns us, vs
+        # to the updates already pending: (W, V, C^-1 rows, det C, number of updates)
+        # with W = A^-1 U and C = I + V^T A^-1 U for all the columns so far, A being the
+        # factored matrix. None when the LU should be recomputed instead.
+        W, V, updates = ([], [], 0) if update is None else (update[0], update[1], update[4])
+        if updates >= REFACTOR_AFTER:
+            return None
+
+        W = W + [self._lu_substitute(u) for u in us]
+        V = V + vs
+        S = [[sum(a * b for a, b in zip(v, w)) for w in W] for v in V]
+        capacitance = self._capacitance(S)
+        if capacitance is None:
+            return None
+        C_inverse, det_C = capacitance
+        return (W, V, C_inverse._rows(), det_C, updates + 1)
+
+    def _woodbury(self, cached, us, vs):
+        # New (inverse, updates) after adding sum of u v^T over the columns us, vs, or None
+        # when the update is not numerically safe (the inverse is then recomputed when needed)
+        inverse_data, updates = cached
+        if updates >= REFACTOR_AFTER:
+            return None
+
+        n = self.rows
+        inv_rows = [inverse_data[i * n:(i + 1) * n].tolist() for i in range(n)]
+
+        # W = A^-1 U (kept by columns) and Z = V^T A^-1 (by rows)
+        W = [[sum(a * b for a, b in zip(row, u)) for row in inv_rows] for u in us]
+        Z = []
+        for v in vs:
+            z = [0.0] * n
+            for vi, row in zip(v, inv_rows):
+                if vi:
+                    z = [a + vi * b for a, b in zip(z, row)]
+            Z.append(z)
+
+        # capacitance matrix C = I + V^T A^-1 U
+        k = len(us)
+        S = [[sum(a * b for a, b in zip(v, w)) for w in W] for v in vs]
+        capacitance = self._capacitance(S)
+        if capacitance is None:
+            return None
+
+        C_inverse = capacitance[0]
+        M = (C_inverse * Matrix(Z))._rows()
+        result = array('d')
+        for i, row in enumerate(inv_rows):
+            for t in range(k):
+                f = W[t][i]
+                if f:
+                    row = [a - f * b for a, b in zip(row, M[t])]
+            result.extend(row)
+        return (result, updates + 1)
+
+    def rank_update(self, u, v):
+        # A += u v^T in place for two lists (Sherman-Morrison update of the cached inverse / LU)
+        return self.low_rank_update(Matrix._from_buffer(array('d', u), len(u), 1),
+                                    Matrix._from_buffer(array('d', v), len(v), 1))
+
+    def replace_row(self, i, values):
+        # Set row i to values in place, as the rank-1 update e_i (values - old row)^T
+        old = self[i]._flat()
+        if len(values) != self.cols:
+            raise ValueError("Row must have as many entries as the matrix has columns")
+        e = [0.0] * self.rows
+        e[i] = 1.0
+        return self.rank_update(e, [float(x) - y for x, y in zip(values, old)])
+
+    def replace_column(self, j, values):
+        # Set column j to values in place, as the rank-1 update (values - old column) e_j^T
+        old = self[:, j]._flat()
+        if len(values) != self.rows:
+            raise ValueError("Column must have as many entries as the matrix has rows")
+        e = [0.0] * self.cols
+        e[j] = 1.0
+        return self.rank_update([float(x) - y for x, y in zip(values, old)], e)
+
+    def _qr_factor(self):
+        # Householder QR of the matrix (rows >= cols) or of its transpose (rows < cols),
+        # computed once and cached. Returns (R, reflectors) where R is the square upper
+        # triangle as row lists and reflectors holds one (v, v.v) pair per column, or
+        # None when that column needed no reflection.
+        self._sync()
+        if self._qr is not None:
+            return self._qr
+
+        A = self._rows() if self.rows >= self.cols else self.transpose()._rows()
+        m, n = len(A), len(A[0])
+        reflectors = []
+
+        for k in range(n):
+            v = [A[i][k] for i in range(k, m)]
+            norm = sum(x * x for x in v) ** 0.5
+            if norm == 0:
+                reflectors.append(None)
                 continue
+            # reflect onto -sign(x0) * |x| e1 to avoid cancellation
+            v[0] += norm if v[0] >= 0 else -norm
+            vv = sum(x * x for x in v)
+            for j in range(k, n):
+                f = 2 * sum(v[i - k] * A[i][j] for i in range(k, m)) / vv
+                for i in range(k, m):
+                    A[i][j] -= f * v[i - k]
+            reflectors.append((v, vv))
 
-            A[r], A[pivot] = A[pivot], A[r]
+        R = [A[i][:n] for i in range(n)]
+        scale = max(abs(R[i][j]) for i in range(n) for j in range(i, n))
+        if any(abs(R[i][i]) <= max(m, n) * EPSILON * scale for i in range(n)):
+            raise ValueError("Matrix does not have full rank, the least-squares solution is not unique")
 
-            pivot_value = A[r][c]
-            A[r] = [x / pivot_value for x in A[r]]
+        self._qr = (R, reflectors)
+        return self._qr
 
-            for i in range(self.rows):
-                if i != r and A[i][c] != 0:
-                    factor = A[i][c]
-                    A[i] = [A[i][j] - factor * A[r][j] for j in range(self.cols)]
+    @staticmethod
+    def _reflect(y, reflectors, order):
+        # Apply the Householder reflections to y in place, in the given order of columns
+        for k in order:
+            if reflectors[k] is None:
+                continue
+            v, vv = reflectors[k]
+            f = 2 * sum(v[i] * y[k + i] for i in range(len(v))) / vv
+            for i in range(len(v)):
+                y[k + i] -= f * v[i]
 
-            r += 1
-            if r == self.rows:
-                break
+    def _qr_solve(self, b):
+        # Least-squares solution of A x = b (rows > cols), or the minimum-norm
+        # solution (rows < cols), for a single right-hand side
+        R, reflectors = self._qr_factor()
+        n = len(R)
+
+        if self.rows >= self.cols:
+            # A = Q R: solve R x = (Q^T b)[:n] by back substitution
+            y = list(b)
+            self._reflect(y, reflectors, range(n))
+            x = y[:n]
+            for i in range(n - 1, -1, -1):
+                s = x[i]
+                for j in range(i + 1, n):
+                    s -= R[i][j] * x[j]
+                x[i] = s / R[i][i]
+            return x
+
+        # A^T = Q R, so A = R^T Q^T: solve R^T y = b by forward substitution, then x = Q y
+        y = list(b)
+        for i in range(n):
+            s = y[i]
+            for j in range(i):
+                s -= R[j][i] * y[j]
+            y[i] = s / R[i][i]
+        x = y + [0.0] * (self.cols - n)
+        self._reflect(x, reflectors, range(n - 1, -1, -1))
+        return x
+
+    def solve(self, b):
+        # Solve A x = b. b can be a list (one right-hand side, a list is returned) or a
+        # Matrix whose columns are right-hand sides (a Matrix of solutions is returned).
+        # The factorization of A is cached, so solving again with a new b only costs the
+        # forward and back substitutions (or the product with the inverse, when one was
+        # computed and kept up to date by low-rank updates). Non-square systems are solved in the
+        # least-squares sense (or with the minimum-norm solution when underdetermined).
+        self._sync()
+        single = not isinstance(b, Matrix)
+        if single:
+            b = Matrix._from_buffer(array('d', b), len(b), 1) if len(b) else None
+        if b is None or b.rows != self.rows:
+            raise ValueError("Right-hand side must have as many entries as the matrix has rows")
+
+        if self.rows == self.cols and self._inv is not None:
+            solve_one = self._inv_solve
+        elif self.rows == self.cols:
+            self._check_invertible("Matrix is singular, the system has no unique solution")
+            solve_one = self._lu_solve
+        else:
+            solve_one = self._qr_solve
+
+        k = b.cols
+        result = array('d', bytes(8 * self.cols * k))
+        for j, column in enumerate(b.transpose()._rows()):
+            result[j::k] = array('d', solve_one(column))
+
+        if single:
+            return result.tolist()
+        return Matrix._from_buffer(result, self.cols, k)
+
+    def rref(self):
+        # Reduced row echelon form, the elimination itself is done by the backend
+        result = Matrix._backend.rref(self._flat(), self.rows, self.cols)
+        return Matrix._from_buffer(result, self.rows, self.cols)
 
-        A = [[clean(x) for x in row] for row in A]        
-        return Matrix(A)
-    
     def augment(self, vector):
         # Augment this matrix with a column vector (for solving Ax = b).
-        
+
         if not isinstance(vector, Matrix):
             # Convert list to column matrix
             vector = Matrix([[v] for v in vector])
 
         if self.rows != vector.rows:
             raise ValueError("Matrix rows must match vector length")
-        
+
         if vector.cols != 1:
             raise ValueError("Vector must be a single column")
-        
+
         # Combine data: append vector column to each row
-        augmented_data = [row + [vector.data[i][0]] for i, row in enumerate(self.data)]
-        return Matrix(augmented_data)
-    
-    
-    
+        column = vector._flat()
+        augmented = array('d')
+        for i, row in enumerate(self._rows()):
+            augmented.extend(row)
+            augmented.append(column[i])
+        return Matrix._from_buffer(augmented, self.rows, self.cols + 1)
@@ -0,0 +1,151 @@
+"""
+Reading and writing matrices.
+
+Binary format: a 24 byte header followed by the elements in row-major order
+as raw little-endian doubles.
+
+    offset  size  field
+    0       4     magic b'LAMX'
+    4       1     format version (1)
+    5       1     dtype code (1 = float64)
+    6       2     padding
+    8       8     rows (little-endian unsigned)
+    16      8     cols (little-endian unsigned)
+    24      ...   rows * cols float64 values
+
+Files can be loaded into memory or memory-mapped, in which case the Matrix
+works directly on the mapped pages. Text input (comma-separated columns, one
+row per line, the calculator's input format) is parsed in chunks of lines with
+bulk float conversion.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import islice
+
+from matrix import Matrix
+
+MAGIC = b'LAMX'
+VERSION = 1
+DTYPE_FLOAT64 = 1
+HEADER = struct.Struct('<4sBB2xQQ')
+
+# Lines converted per chunk by the CSV importer
+CHUNK_LINES = 8192
+
+
+def save(matrix: Matrix, path: str):
+    """Writes matrix to path in the binary format."""
+    values = matrix._flat()
+    if sys.byteorder == 'big':
+        values = array('d', values)
+        values.byteswap()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, DTYPE_FLOAT64, matrix.rows, matrix.cols))
+        f.write(values)
+
+
+def _read_header(f, path: str):
+    # (rows, cols) from the header of an open file, which must also hold all the elements
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is not a matrix file (too short)")
+    magic, version, dtype, rows, cols = HEADER.unpack(header[:HEADER.size])
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a matrix file")
+    if version != VERSION:
+        raise ValueError(f"{path} uses format version {version}, only version {VERSION} is supported")
+    if dtype != DTYPE_FLOAT64:
+        raise ValueError(f"{path} has an unsupported dtype code {dtype}")
+    if rows == 0 or cols == 0:
+        raise ValueError("Matrix cannot be empty")
+    if os.fstat(f.fileno()).st_size < HEADER.size + rows * cols * 8:
+        raise ValueError(f"{path} is truncated")
+    return rows, cols
+
+
+def load(path: str, mmap_mode: bool = False, writable: bool = False) -> Matrix:
+    """
+    Reads a matrix saved with save(). With mmap_mode the file is memory-mapped
+    instead of read: the elements are only paged in when used. writable maps it
+    read-write, so in-place results (inverse(out=...)) go straight to the file.
+    """
+    if writable and not mmap_mode:
+        raise ValueError("writable only applies to memory-mapped loading, a loaded matrix is always writable")
+    if not mmap_mode:
+        with open(path, 'rb') as f:
+            rows, cols = _read_header(f, path)
+            values = array('d')
+            values.fromfile(f, rows * cols)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return Matrix._from_buffer(values, rows, cols)
+
+    if sys.byteorder == 'big':
+        raise ValueError("Memory-mapped loading needs a little-endian machine")
+
+    with open(path, 'r+b' if writable else 'rb') as f:
+        rows, cols = _read_header(f, path)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+    values = memoryview(mapped)[HEADER.size:HEADER.size + rows * cols * 8].cast('d')
+    return Matrix._from_buffer(values, rows, cols)
+
+
+def parse_lines(lines, matrix_name: str = "Matrix", delimiter: str = ',', values: array = None, cols: int = None, first_line: int = 1):
+    """
+    Parses text lines (columns separated by delimiter) into a flat array('d').
+    Blank lines and empty fields are skipped, like in the calculator input box.
+    Returns (values, cols, rows_read); values and cols can be passed back in to
+    continue with the next chunk of the same matrix, first_line is the line
+    number of lines[0] in error messages.
+    """
+    if values is None:
+        values = array('d')
+    rows_read = 0
+    for row, line in enumerate(lines, first_line):
+        parts = line.split(delimiter)
+        before = len(values)
+        try:
+            # float() ignores surrounding whitespace, so the common case needs no cleanup
+            values.extend(map(float, parts))
+        except ValueError:
+            del values[before:]
+            elements = [p.strip() for p in parts]
+            elements = [e for e in elements if e]
+            if not elements:
+                # blank line
+                continue
+            try:
+                values.extend(map(float, elements))
+            except ValueError as e:
+                del values[before:]
+                raise ValueError(f"Invalid element in {matrix_name}, row {row}. Ensure all elements are numeric.") from e
+
+        count = len(values) - before
+        if cols is None:
+            cols = count
+        elif count != cols:
+            raise ValueError("All rows must have the same number of columns")
+        rows_read += 1
+    return values, cols, rows_read
+
+
+def read_csv(path: str, delimiter: str = ',', chunk_lines: int = CHUNK_LINES, matrix_name: str = "Matrix") -> Matrix:
+    """Imports a text file, chunk_lines lines at a time, straight into one flat buffer."""
+    values = array('d')
+    cols = None
+    rows = 0
+    line = 1
+    with open(path) as f:
+        while True:
+            chunk = list(islice(f, chunk_lines))
+            if not chunk:
+                break
+            values, cols, read = parse_lines(chunk, matrix_name, delimiter, values, cols, line)
+            rows += read
+            line += len(chunk)
+    if not rows:
+        raise ValueError(f"{matrix_name} input cannot be empty.")
+    return Matrix._from_buffer(values, rows, cols)
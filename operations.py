@@ -0,0 +1,93 @@
+"""
+Parsing and dispatch shared by the GUI (app.py) and the batch mode (cli.py).
+"""
+from array import array
+
+from matrix import Matrix
+from matrixio import parse_lines
+from sparse import SparseMatrix, SPARSE_DENSITY
+
+UNARY_OPERATIONS = ('det', 'inv', 'rref', 'tra')
+BINARY_OPERATIONS = ('add', 'sub', 'mul')
+
+
+def _finish(values, rows: int, cols: int) -> Matrix | SparseMatrix:
+    # Wrap parsed values in a Matrix (or a SparseMatrix when the input is mostly zeros)
+    matrix = Matrix._from_buffer(values, rows, cols)
+
+    nonzeros = len(values) - values.count(0.0)
+    if nonzeros <= SPARSE_DENSITY * rows * cols:
+        return SparseMatrix.from_dense(matrix)
+
+    return matrix
+
+
+def build_matrix(matrix_data: list, matrix_name: str = "Matrix") -> Matrix | SparseMatrix:
+    """
+    Turns a list of rows into a Matrix object (or a SparseMatrix when the input is
+    mostly zeros), converting every element to float once.
+    """
+    values = array('d')
+    cols = None
+    rows = 0
+    for i, row in enumerate(matrix_data):
+        before = len(values)
+        try:
+            values.extend(map(float, row))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid element in {matrix_name}, row {i+1}. Ensure all elements are numeric.") from e
+        count = len(values) - before
+        if not count:
+            continue
+        if cols is None:
+            cols = count
+        elif count != cols:
+            raise ValueError("All rows must have the same number of columns")
+        rows += 1
+
+    if not rows:
+        raise ValueError(f"{matrix_name} input cannot be empty.")
+
+    return _finish(values, rows, cols)
+
+
+def parse_matrix(input_str: str, matrix_name: str = "Matrix") -> Matrix | SparseMatrix:
+    """
+    Parses text where columns are comma-separated and rows are on new lines.
+    """
+    if not input_str.strip():
+        raise ValueError(f"{matrix_name} input cannot be empty.")
+
+    values, cols, rows = parse_lines(input_str.strip().split('\n'), matrix_name)
+    if not rows:
+        raise ValueError(f"{matrix_name} input cannot be empty.")
+
+    return _finish(values, rows, cols)
+
+
+def compute(operation: str, matrix_a, matrix_b=None):
+    """Runs one of the calculator operations and returns its result (a number or a matrix)."""
+    if operation == 'det':
+        return matrix_a.det()
+    elif operation == 'inv':
+        return matrix_a.inverse()
+    elif operation == 'rref':
+        return matrix_a.rref()
+    elif operation == 'tra':
+        return matrix_a.transpose()
+    elif operation in BINARY_OPERATIONS and matrix_b is None:
+        raise ValueError(f"Operation '{operation}' needs two matrices")
+    elif operation == 'add':
+        return matrix_a + matrix_b
+    elif operation == 'sub':
+        return matrix_a - matrix_b
+    elif operation == 'mul':
+        return matrix_a * matrix_b
+    raise ValueError(f"Unknown operation '{operation}'")
+
+
+def format_result(operation: str, result) -> str:
+    """Text shown for a result: determinants with 6 decimals, matrices as rows of numbers."""
+    if operation == 'det':
+        return f"{result:.6f}"
+    return str(result)
@@ -0,0 +1,181 @@
+"""
+Multi-core backend for Matrix.
+
+Large products and the row updates of rref are split into row blocks and run
+on a pool of worker processes. The operands live in
+multiprocessing.shared_memory blocks, so the workers read and write them in
+place instead of receiving pickled copies. Work below the size threshold runs
+on the serial backend, so small matrices never pay for the process round trip.
+
+    Matrix.use_backend(ParallelBackend(workers=32, threshold=256))
+"""
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from backends import PythonBackend
+
+
+def _shared_from(values):
+    # New shared memory block holding a copy of an array('d')
+    shm = shared_memory.SharedMemory(create=True, size=max(len(values), 1) * 8)
+    view = shm.buf.cast('d')
+    view[:len(values)] = values
+    view.release()
+    return shm
+
+
+def _release(*blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+def _matmul_rows(a_name, b_name, out_name, n, p, start, stop):
+    # Worker: rows start..stop of out = a * b, in i-k-j order
+    a_shm = shared_memory.SharedMemory(name=a_name)
+    b_shm = shared_memory.SharedMemory(name=b_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    a, b, out = a_shm.buf.cast('d'), b_shm.buf.cast('d'), out_shm.buf.cast('d')
+    try:
+        b_rows = [b[k * p:(k + 1) * p].tolist() for k in range(n)]
+        for i in range(start, stop):
+            acc = [0.0] * p
+            for aik, brow in zip(a[i * n:(i + 1) * n].tolist(), b_rows):
+                if aik:
+                    acc = [x + aik * y for x, y in zip(acc, brow)]
+            out[i * p:(i + 1) * p] = array('d', acc)
+    finally:
+        a.release()
+        b.release()
+        out.release()
+        a_shm.close()
+        b_shm.close()
+        out_shm.close()
+
+
+def _eliminate_rows(name, cols, r, c, start, stop):
+    # Worker: clear column c in rows start..stop (except the pivot row r) using row r,
+    # returns the number of rows it changed
+    shm = shared_memory.SharedMemory(name=name)
+    A = shm.buf.cast('d')
+    try:
+        pivot_row = A[r * cols:(r + 1) * cols].tolist()
+        eliminated = 0
+        for i in range(start, stop):
+            if i == r:
+                continue
+            factor = A[i * cols + c]
+            if factor != 0:
+                row = A[i * cols:(i + 1) * cols].tolist()
+                A[i * cols:(i + 1) * cols] = array('d', [x - factor * y for x, y in zip(row, pivot_row)])
+                eliminated += 1
+    finally:
+        A.release()
+        shm.close()
+    return eliminated
+
+
+class ParallelBackend:
+    '''Splits large products and eliminations by row blocks over a process pool.'''
+    name = 'parallel'
+    row_operations = 0
+
+    def __init__(self, workers: int = None, threshold: int = 256, serial=None):
+        # workers: size of the process pool (all cores by default)
+        # threshold: products of n x n matrices (or rref of n x n) below this n stay serial
+        # serial: backend used for the small cases and for add/sub (pure Python by default)
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.serial = serial if serial is not None else PythonBackend()
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        '''Shuts the worker processes down (they are started again when needed).'''
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _blocks(self, rows):
+        # contiguous row ranges, one per worker
+        size = -(-rows // self.workers)
+        return [(start, min(start + size, rows)) for start in range(0, rows, size)]
+
+    def add(self, a, b):
+        return self.serial.add(a, b)
+
+    def sub(self, a, b):
+        return self.serial.sub(a, b)
+
+    def matmul(self, a, b, m, n, p):
+        if self.workers < 2 or m < 2 or m * n * p < self.threshold ** 3:
+            return self.serial.matmul(a, b, m, n, p)
+
+        a_shm, b_shm = _shared_from(a), _shared_from(b)
+        out_shm = shared_memory.SharedMemory(create=True, size=m * p * 8)
+        try:
+            futures = [self._executor().submit(_matmul_rows, a_shm.name, b_shm.name, out_shm.name, n, p, start, stop)
+                       for start, stop in self._blocks(m)]
+            for future in futures:
+                future.result()
+            out = out_shm.buf.cast('d')
+            result = array('d', out)
+            out.release()
+        finally:
+            _release(a_shm, b_shm, out_shm)
+        return result
+
+    def rref(self, a, rows, cols):
+        if self.workers < 2 or rows < 2 or rows * cols < self.threshold ** 2:
+            before = getattr(self.serial, 'row_operations', 0)
+            result = self.serial.rref(a, rows, cols)
+            self.row_operations += getattr(self.serial, 'row_operations', 0) - before
+            return result
+
+        shm = _shared_from(a)
+        A = shm.buf.cast('d')
+        try:
+            blocks = self._blocks(rows)
+            r = 0
+            for c in range(cols):
+                # pivot search, swap and scaling are cheap, they stay in this process
+                pivot = None
+                for i in range(r, rows):
+                    if A[i * cols + c] != 0:
+                        pivot = i
+                        break
+
+                if pivot is None:
+                    continue
+
+                if pivot != r:
+                    row = A[pivot * cols:(pivot + 1) * cols].tolist()
+                    A[pivot * cols:(pivot + 1) * cols] = array('d', A[r * cols:(r + 1) * cols].tolist())
+                    A[r * cols:(r + 1) * cols] = array('d', row)
+                    self.row_operations += 1
+
+                pivot_value = A[r * cols + c]
+                A[r * cols:(r + 1) * cols] = array('d', [x / pivot_value for x in A[r * cols:(r + 1) * cols].tolist()])
+                self.row_operations += 1
+
+                # the O(rows * cols) update of every other row is split across the workers
+                futures = [self._executor().submit(_eliminate_rows, shm.name, cols, r, c, start, stop)
+                           for start, stop in blocks]
+                for future in futures:
+                    self.row_operations += future.result()
+
+                r += 1
+                if r == rows:
+                    break
+
+            result = array('d', [0.0 if abs(x) < 1e-10 else x for x in A.tolist()])
+        finally:
+            A.release()
+            _release(shm)
+        return result
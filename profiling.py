@@ -0,0 +1,241 @@
+"""
+Opt-in instrumentation for Matrix.
+
+While profiling is on, the public Matrix operations are wrapped to record per
+operation call counts, elapsed time, Matrix allocations (objects and buffer
+bytes) and flop estimates. Times include nested operations (inverse calls
+transpose, for example), allocations are counted for the innermost one. While
+it is off the original methods are restored, so there is no overhead at all.
+
+    with profiling.profile() as p:
+        A.inverse() * B
+    print(p.format_report())
+
+Setting the MATRIX_PROFILE environment variable asks for a report of the whole
+run on stderr at exit. app.py and cli.py collect it from their worker
+processes (see requested()), scripts doing the work in-process call
+enable_from_environment() at startup.
+
+"row ops" are the elementary row operations (swaps, scalings, eliminations)
+rref performed, as counted by the compute backend.
+"""
+import atexit
+import os
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+ENV_VAR = 'MATRIX_PROFILE'
+
+# Matrix methods that get wrapped while profiling is on
+INSTRUMENTED = ('__add__', '__sub__', '__mul__', 'transpose', 'lu', 'det', 'inverse', 'solve', 'low_rank_update', 'rref', 'augment')
+
+FIELDS = ('calls', 'seconds', 'allocations', 'bytes', 'flops', 'row_operations')
+
+
+def _lu_flops(matrix) -> int:
+    # LU costs about 2n^3/3 flops, but only for the call that actually factors
+    return 2 * matrix.rows ** 3 // 3 if matrix._lu is None else 0
+
+
+def _flops(name: str, matrix, args) -> int:
+    """Estimated floating point operations of one call, computed before it runs."""
+    m, n = matrix.rows, matrix.cols
+    other = args[0] if args else None
+    # caches left over from before a write through another view don't count
+    matrix._sync()
+    if name in ('__add__', '__sub__'):
+        return m * n
+    if name == '__mul__':
+        return 2 * m * n * getattr(other, 'cols', 0)
+    if name in ('lu', 'det'):
+        return _lu_flops(matrix) + (n if name == 'det' else 0)
+    if name == 'inverse':
+        # n forward/back substitutions of 2n^2 flops each, nothing when the inverse is cached
+        return 0 if matrix._inv is not None else _lu_flops(matrix) + 2 * n ** 3
+    if name == 'solve':
+        k = other.cols if hasattr(other, 'cols') else 1
+        if m == n and matrix._inv is not None:
+            return 2 * n * n * k
+        if m == n:
+            return _lu_flops(matrix) + 2 * n * n * k
+        # Householder QR plus the substitutions
+        big, small = max(m, n), min(m, n)
+        return (2 * big * small * small if matrix._qr is None else 0) + 4 * big * small * k
+    if name == 'low_rank_update':
+        # the elements, plus A^-1 U, V^T A^-1 and the correction of a cached inverse,
+        # and the substitutions for A^-1 U with a cached LU
+        k = getattr(other, 'cols', 1)
+        return (2 * m * n * k + (6 * n * n * k if matrix._inv is not None else 0)
+                + (2 * n * n * k if matrix._lu is not None else 0))
+    if name == 'rref':
+        return 2 * m * n * min(m, n)
+    return 0
+
+
+class Profiler:
+    """Collects the statistics of the operations run while it is enabled."""
+
+    def __init__(self):
+        self.stats = {}
+
+    def _entry(self, name: str) -> dict:
+        if name not in self.stats:
+            self.stats[name] = dict.fromkeys(FIELDS, 0)
+        return self.stats[name]
+
+    def record(self, name: str, seconds: float, allocations: int, nbytes: int, flops: int, row_operations: int = 0):
+        entry = self._entry(name)
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['allocations'] += allocations
+        entry['bytes'] += nbytes
+        entry['flops'] += flops
+        entry['row_operations'] += row_operations
+
+    def merge(self, report: dict):
+        """Adds a report (from another Profiler, e.g. in a worker process) to this one."""
+        for name, values in report.items():
+            entry = self._entry(name)
+            for field in FIELDS:
+                entry[field] += values.get(field, 0)
+
+    def reset(self):
+        self.stats.clear()
+
+    def report(self) -> dict:
+        """Per-operation statistics as a plain dict: {operation: {field: value}}."""
+        return {name: dict(values) for name, values in self.stats.items()}
+
+    def format_report(self) -> str:
+        if not self.stats:
+            return 'No Matrix operations recorded.'
+        lines = [f"{'operation':<16}{'calls':>8}{'time (ms)':>12}{'allocs':>9}{'KiB':>10}{'Mflop':>10}{'row ops':>10}"]
+        for name, s in sorted(self.stats.items(), key=lambda item: -item[1]['seconds']):
+            lines.append(f"{name.strip('_'):<16}{s['calls']:>8}{s['seconds'] * 1000:>12.3f}{s['allocations']:>9}"
+                         f"{s['bytes'] / 1024:>10.1f}{s['flops'] / 1e6:>10.3f}{s['row_operations']:>10}")
+        return '\n'.join(lines)
+
+
+# Profilers currently enabled (contexts can be nested) and the methods they replaced
+_profilers = []
+_originals = {}
+# One [allocations, bytes] frame per instrumented call in progress
+_frames = []
+_env_profiler = None
+
+
+def _count_allocation(matrix):
+    if _frames:
+        frame = _frames[-1]
+        frame[0] += 1
+        frame[1] += matrix.rows * matrix.cols * 8
+
+
+def _wrap(name: str, method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        flops = _flops(name, self, args)
+        frame = [0, 0]
+        _frames.append(frame)
+        backend = type(self)._backend
+        counted = getattr(backend, 'row_operations', 0)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            # calls that raise (a singular inverse, say) are recorded as well
+            elapsed = time.perf_counter() - start
+            _frames.pop()
+            row_operations = getattr(backend, 'row_operations', 0) - counted if name == 'rref' else 0
+            for profiler in _profilers:
+                profiler.record(name, elapsed, frame[0], frame[1], flops, row_operations)
+    return wrapper
+
+
+def _install():
+    from matrix import Matrix
+
+    for name in INSTRUMENTED:
+        method = Matrix.__dict__[name]
+        _originals[name] = method
+        setattr(Matrix, name, _wrap(name, method))
+
+    init = Matrix.__dict__['__init__']
+    from_buffer = Matrix.__dict__['_from_buffer'].__func__
+    _originals['__init__'] = init
+    _originals['_from_buffer'] = Matrix.__dict__['_from_buffer']
+
+    # wraps() keeps the names: pickle finds Matrix._from_buffer (see Matrix.__reduce__) by name
+    @wraps(init)
+    def counted_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        _count_allocation(self)
+
+    @wraps(from_buffer)
+    def counted_from_buffer(cls, *args, **kwargs):
+        m = from_buffer(cls, *args, **kwargs)
+        # views share their buffer, only count the bytes of new buffers
+        if m._is_compact():
+            _count_allocation(m)
+        elif _frames:
+            _frames[-1][0] += 1
+        return m
+
+    Matrix.__init__ = counted_init
+    Matrix._from_buffer = classmethod(counted_from_buffer)
+
+
+def _uninstall():
+    from matrix import Matrix
+
+    for name, method in _originals.items():
+        setattr(Matrix, name, method)
+    _originals.clear()
+
+
+def enable(profiler: Profiler = None) -> Profiler:
+    """Starts recording into profiler (a new one if not given) and returns it."""
+    if profiler is None:
+        profiler = Profiler()
+    if not _profilers:
+        _install()
+    _profilers.append(profiler)
+    return profiler
+
+
+def disable(profiler: Profiler):
+    """Stops recording into profiler, the Matrix methods are restored once no profiler is left."""
+    if profiler in _profilers:
+        _profilers.remove(profiler)
+    if not _profilers and _originals:
+        _uninstall()
+
+
+def is_enabled() -> bool:
+    return bool(_profilers)
+
+
+@contextmanager
+def profile(profiler: Profiler = None):
+    """Context manager that records the Matrix operations run inside it."""
+    profiler = enable(profiler)
+    try:
+        yield profiler
+    finally:
+        disable(profiler)
+
+
+def requested() -> bool:
+    """True when MATRIX_PROFILE is set (and not '0')."""
+    return os.environ.get(ENV_VAR, '0') not in ('', '0')
+
+
+def enable_from_environment():
+    """Turns profiling on for the whole process when MATRIX_PROFILE is set (and not '0')."""
+    global _env_profiler
+    if _env_profiler is not None or not requested():
+        return
+    _env_profiler = enable()
+    atexit.register(lambda: print(_env_profiler.format_report(), file=sys.stderr))
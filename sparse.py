@@ -0,0 +1,284 @@
+from array import array
+
+from matrix import Matrix
+
+# Inputs with at most this fraction of non-zero entries are worth storing sparse
+SPARSE_DENSITY = 0.05
+
+
+class SparseMatrix:
+    # Compressed sparse row (CSR) storage: the non-zeros of row i are
+    # values[indptr[i]:indptr[i + 1]], in the columns given by the same slice of indices.
+    __slots__ = ('rows', 'cols', 'indptr', 'indices', 'values')
+
+    def __init__(self, rows: int, cols: int, row_indices=(), col_indices=(), values=()):
+        # Build from coordinate (COO) triplets, duplicate entries are summed
+        if rows <= 0 or cols <= 0:
+            raise ValueError("Matrix cannot be empty")
+        if not len(row_indices) == len(col_indices) == len(values):
+            raise ValueError("Row indices, column indices and values must have the same length")
+
+        self.rows = rows
+        self.cols = cols
+
+        entries = [dict() for _ in range(rows)]
+        for i, j, v in zip(row_indices, col_indices, values):
+            if not (0 <= i < rows and 0 <= j < cols):
+                raise ValueError(f"Entry ({i}, {j}) is outside of a {rows}x{cols} matrix")
+            row = entries[i]
+            row[j] = row.get(j, 0.0) + float(v)
+
+        self._set_rows(entries)
+
+    @classmethod
+    def _from_csr(cls, rows, cols, indptr, indices, values):
+        # Fast constructor for internally produced results: no validation, no copy
+        m = object.__new__(cls)
+        m.rows = rows
+        m.cols = cols
+        m.indptr = indptr
+        m.indices = indices
+        m.values = values
+        return m
+
+    @classmethod
+    def _from_rows(cls, rows, cols, entries):
+        # entries is a list with one {column: value} dict per row
+        m = object.__new__(cls)
+        m.rows = rows
+        m.cols = cols
+        m._set_rows(entries)
+        return m
+
+    def _set_rows(self, entries):
+        self.indptr = array('q', [0])
+        self.indices = array('q')
+        self.values = array('d')
+        for row in entries:
+            for j in sorted(row):
+                if row[j] != 0:
+                    self.indices.append(j)
+                    self.values.append(row[j])
+            self.indptr.append(len(self.values))
+
+    @classmethod
+    def from_dense(cls, matrix):
+        # Convert a Matrix (or a list of rows) to sparse storage, dropping the zeros
+        if not isinstance(matrix, Matrix):
+            matrix = Matrix(matrix)
+        flat = matrix._flat()
+        c = matrix.cols
+        indptr = array('q', [0])
+        indices = array('q')
+        values = array('d')
+        for i in range(matrix.rows):
+            for j, v in enumerate(flat[i * c:(i + 1) * c]):
+                if v != 0:
+                    indices.append(j)
+                    values.append(v)
+            indptr.append(len(values))
+        return cls._from_csr(matrix.rows, c, indptr, indices, values)
+
+    def to_dense(self):
+        # Convert back to a regular Matrix
+        flat = array('d', bytes(8 * self.rows * self.cols))
+        for i in range(self.rows):
+            base = i * self.cols
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                flat[base + self.indices[k]] = self.values[k]
+        return Matrix._from_buffer(flat, self.rows, self.cols)
+
+    def _row(self, i):
+        # {column: value} dict of the non-zeros of row i
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        return dict(zip(self.indices[start:stop], self.values[start:stop]))
+
+    @property
+    def nnz(self):
+        # Number of stored non-zero entries
+        return len(self.values)
+
+    def density(self):
+        # Fraction of the entries that are non-zero
+        return self.nnz / (self.rows * self.cols)
+
+    def matvec(self, x):
+        # Product with a vector (list of floats), touching only the stored non-zeros
+        if len(x) != self.cols:
+            raise ValueError("Vector must have as many entries as the matrix has columns")
+        indptr, indices, values = self.indptr, self.indices, self.values
+        return [sum(values[k] * x[indices[k]] for k in range(indptr[i], indptr[i + 1])) for i in range(self.rows)]
+
+    def diagonal(self):
+        # Entries (i, i) as a list
+        return [self._row(i).get(i, 0.0) for i in range(min(self.rows, self.cols))]
+
+    def format_cells(self, row_start=0, row_stop=None, col_start=0, col_stop=None, precision=2):
+        # Formatted text of a window of cells, built from the stored non-zeros of those rows only
+        row_start, col_start = max(row_start, 0), max(col_start, 0)
+        row_stop = self.rows if row_stop is None else min(row_stop, self.rows)
+        col_stop = self.cols if col_stop is None else min(col_stop, self.cols)
+        zero = f"{0.0:.{precision}f}"
+        cells = []
+        for i in range(row_start, row_stop):
+            row = [zero] * (col_stop - col_start)
+            for j, v in self._row(i).items():
+                if col_start <= j < col_stop:
+                    row[j - col_start] = f"{v:.{precision}f}"
+            cells.append(row)
+        return cells if col_stop > col_start else []
+
+    def iter_lines(self, precision=2):
+        for i in range(self.rows):
+            yield ' '.join(self.format_cells(i, i + 1, 0, self.cols, precision)[0])
+
+    # the window and summary layouts only need format_cells
+    format_window = Matrix.format_window
+    summary = Matrix.summary
+
+    def __str__(self):
+        return '\n'.join(self.iter_lines())
+
+    def __repr__(self):
+        return f"<SparseMatrix {self.rows}x{self.cols} with {self.nnz} non-zeros>"
+
+    def __eq__(self, other):
+        if isinstance(other, Matrix):
+            other = SparseMatrix.from_dense(other)
+        if not isinstance(other, SparseMatrix):
+            return NotImplemented
+        return (self.rows == other.rows and self.cols == other.cols and self.indptr == other.indptr
+                and self.indices == other.indices and self.values == other.values)
+
+    def _combine(self, other, sign):
+        # self + sign * other for two sparse matrices, merging the rows
+        entries = []
+        for i in range(self.rows):
+            row = self._row(i)
+            start, stop = other.indptr[i], other.indptr[i + 1]
+            for j, v in zip(other.indices[start:stop], other.values[start:stop]):
+                row[j] = row.get(j, 0.0) + sign * v
+            entries.append(row)
+        return SparseMatrix._from_rows(self.rows, self.cols, entries)
+
+    def __add__(self, other):
+        # Add a sparse or dense matrix (only possible for the same dimensions)
+        if not isinstance(other, (SparseMatrix, Matrix)):
+            return NotImplemented
+        if self.rows != other.rows or self.cols != other.cols:
+            raise ValueError("Matrices must have the same dimensions to add")
+
+        if isinstance(other, SparseMatrix):
+            return self._combine(other, 1.0)
+
+        # sparse + dense is dense: add the non-zeros onto a copy of the dense matrix
+        result = array('d', other._flat())
+        for i in range(self.rows):
+            base = i * self.cols
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                result[base + self.indices[k]] += self.values[k]
+        return Matrix._from_buffer(result, self.rows, self.cols)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __neg__(self):
+        return SparseMatrix._from_csr(self.rows, self.cols, array('q', self.indptr),
+                                      array('q', self.indices), array('d', [-v for v in self.values]))
+
+    def __sub__(self, other):
+        # Subtract a sparse or dense matrix (only possible for the same dimensions)
+        if not isinstance(other, (SparseMatrix, Matrix)):
+            return NotImplemented
+        if self.rows != other.rows or self.cols != other.cols:
+            raise ValueError("Matrices must have the same dimensions to subtract")
+
+        if isinstance(other, SparseMatrix):
+            return self._combine(other, -1.0)
+
+        result = array('d', [-x for x in other._flat()])
+        for i in range(self.rows):
+            base = i * self.cols
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                result[base + self.indices[k]] += self.values[k]
+        return Matrix._from_buffer(result, self.rows, self.cols)
+
+    def __rsub__(self, other):
+        # dense - sparse
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        # Multiply by a sparse or dense matrix, only the stored non-zeros are ever touched
+        if not isinstance(other, (SparseMatrix, Matrix)):
+            return NotImplemented
+        if self.cols != other.rows:
+            raise ValueError("Number of columns in the first matrix must equal number of rows in the second matrix")
+
+        if isinstance(other, SparseMatrix):
+            # row-by-row (Gustavson) product: row i of the result is a sum of rows of other
+            entries = []
+            for i in range(self.rows):
+                acc = {}
+                for k in range(self.indptr[i], self.indptr[i + 1]):
+                    a = self.values[k]
+                    r = self.indices[k]
+                    for t in range(other.indptr[r], other.indptr[r + 1]):
+                        j = other.indices[t]
+                        acc[j] = acc.get(j, 0.0) + a * other.values[t]
+                entries.append(acc)
+            return SparseMatrix._from_rows(self.rows, other.cols, entries)
+
+        # sparse * dense is dense
+        b = other._flat()
+        p = other.cols
+        result = array('d')
+        for i in range(self.rows):
+            acc = [0.0] * p
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                a = self.values[k]
+                r = self.indices[k]
+                acc = [x + a * y for x, y in zip(acc, b[r * p:(r + 1) * p])]
+            result.extend(acc)
+        return Matrix._from_buffer(result, self.rows, p)
+
+    def __rmul__(self, other):
+        # dense * sparse = (sparse^T * dense^T)^T
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        if other.cols != self.rows:
+            raise ValueError("Number of columns in the first matrix must equal number of rows in the second matrix")
+        return (self.transpose() * other.transpose()).transpose()
+
+    def transpose(self):
+        # CSR of the transpose, built by counting the entries of each column
+        counts = [0] * (self.cols + 1)
+        for j in self.indices:
+            counts[j + 1] += 1
+        for j in range(self.cols):
+            counts[j + 1] += counts[j]
+
+        indptr = array('q', counts)
+        indices = array('q', bytes(8 * self.nnz))
+        values = array('d', bytes(8 * self.nnz))
+        nxt = counts[:-1]
+        for i in range(self.rows):
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                j = self.indices[k]
+                dest = nxt[j]
+                indices[dest] = i
+                values[dest] = self.values[k]
+                nxt[j] = dest + 1
+
+        return SparseMatrix._from_csr(self.cols, self.rows, indptr, indices, values)
+
+    # Factorizations fill in the zeros anyway, so these go through the dense Matrix
+    def det(self):
+        return self.to_dense().det()
+
+    def inverse(self):
+        return self.to_dense().inverse()
+
+    def rref(self):
+        return self.to_dense().rref()
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from backends import BACKENDS, PythonBackend, compare_backends, get_backend
+from matrix import Matrix
+
+
+def make_backend(name):
+    if name == 'parallel':
+        from parallel import ParallelBackend
+        # threshold=1 so the worker processes run even for the small test inputs
+        return ParallelBackend(workers=2, threshold=1)
+    return get_backend(name)
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request):
+    backend = make_backend(request.param)
+    yield backend
+    if hasattr(backend, 'close'):
+        backend.close()
+
+
+@pytest.fixture
+def use_backend(backend):
+    previous = Matrix._backend
+    Matrix.use_backend(backend)
+    yield backend
+    Matrix.use_backend(previous)
+
+
+def random_matrix(rng, rows, cols):
+    return Matrix([[rng.uniform(-10, 10) for _ in range(cols)] for _ in range(rows)])
+
+
+def assert_close(x, y, tol=1e-9):
+    if isinstance(x, Matrix):
+        assert (x.rows, x.cols) == (y.rows, y.cols)
+        x, y = x._flat().tolist(), y._flat().tolist()
+    assert x == pytest.approx(y, rel=tol, abs=tol)
+
+
+def test_compare_backends(backend):
+    compare_backends(PythonBackend(), backend)
+
+
+def test_matrix_results_agree(use_backend):
+    rng = random.Random(1)
+    A = random_matrix(rng, 7, 7)
+    B = random_matrix(rng, 7, 5)
+    b = [rng.uniform(-1, 1) for _ in range(7)]
+
+    results = {}
+    for backend in (PythonBackend(), use_backend):
+        Matrix.use_backend(backend)
+        results[backend] = [
+            A + A.transpose(),
+            A - A.transpose(),
+            A * B,
+            A.transpose() * B,
+            A[1:6, ::2] * B[::2, 1:4],
+            (A * A).rref(),
+            A.augment(b).rref(),
+            Matrix([[1, 2, 3], [2, 4, 6], [1, 0, 1]]).rref(),
+            A.inverse(),
+            A.solve(b),
+            A.solve(B),
+            A.det(),
+            B.transpose()[1:, :].solve(b[:4]),
+        ]
+
+    reference, results = results.values()
+    for expected, result in zip(reference, results):
+        assert_close(result, expected)
+
+
+def test_rref_row_operations_agree(backend):
+    rng = random.Random(2)
+    a = random_matrix(rng, 6, 7)._flat()
+    c = Matrix([[float(i % 3) * (j + 1) for j in range(7)] for i in range(6)])._flat()
+    reference = PythonBackend()
+    for values in (a, c):
+        before, reference_before = backend.row_operations, reference.row_operations
+        backend.rref(values, 6, 7)
+        reference.rref(values, 6, 7)
+        assert backend.row_operations - before == reference.row_operations - reference_before > 0
+
+
+def test_strassen_matches_blocked_kernel():
+    # off by default, small threshold and block size so every path (odd padding included) runs
+    rng = random.Random(3)
+    for n in (8, 9, 13):
+        a, b = random_matrix(rng, n, n)._flat(), random_matrix(rng, n, n)._flat()
+        expected = PythonBackend().matmul(a, b, n, n, n)
+        assert_close(PythonBackend(block_size=3, strassen_threshold=4).matmul(a, b, n, n, n).tolist(), expected.tolist())
@@ -0,0 +1,40 @@
+import os
+
+from cache import ResultCache, key_for
+from matrix import Matrix
+from sparse import SparseMatrix
+
+
+def test_disk_tier_round_trip(tmp_path):
+    A = Matrix([[4.0, 7.0], [2.0, 6.0]])
+    S = SparseMatrix(3, 4, [0, 2], [1, 3], [5.0, -1.0])
+    cache = ResultCache(directory=str(tmp_path))
+    cache.put('det', A.det())
+    cache.put('inv', A.inverse())
+    cache.put('sparse', S)
+
+    fresh = ResultCache(directory=str(tmp_path))
+    assert fresh.get('det') == A.det()
+    assert fresh.get('inv') == A.inverse()
+    assert fresh.get('sparse') == S
+    assert fresh.stats()['disk_hits'] == 3
+
+
+def test_unreadable_files_are_misses(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    key = key_for('inverse', Matrix([[2.0]]))
+    cache.put(key, Matrix([[0.5]]))
+    path = cache._path(key)
+    with open(path, 'r+b') as f:
+        f.truncate(30)
+
+    fresh = ResultCache(directory=str(tmp_path))
+    assert fresh.get(key) is None
+    assert not os.path.exists(path)
+
+
+def test_clear_empties_the_disk_tier(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    cache.put('a', 1.5)
+    cache.clear()
+    assert ResultCache(directory=str(tmp_path)).get('a') is None
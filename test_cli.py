@@ -0,0 +1,32 @@
+import io
+import json
+
+import profiling
+from cli import run_batch
+
+
+def test_non_finite_results_are_errors():
+    jobs = io.StringIO('{"id": 1, "op": "det", "a": [["1e400"]]}\n{"id": 2, "op": "det", "a": [[1, 2], [3, 4]]}\n')
+    output = io.StringIO()
+    summary = run_batch(jobs, output)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r['status'] for r in records] == ['error', 'ok']
+    assert records[1]['result'] == -2.0
+    assert summary['failed'] == 1
+
+
+def test_non_finite_ids_are_echoed_as_text():
+    jobs = io.StringIO('{"id": NaN, "op": "det", "a": [[2]]}\n{"id": [1e400], "op": Infinity, "a": [[2]]}\n{"id": 3, "op": "det", "a": [[3]]}\n')
+    output = io.StringIO()
+    summary = run_batch(jobs, output)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [(r['id'], r['op'], r['status']) for r in records] == [
+        ('nan', 'det', 'ok'), ('[inf]', 'inf', 'error'), (3, 'det', 'ok')]
+    assert summary['failed'] == 1
+
+
+def test_profiler_collects_stats_from_workers():
+    jobs = io.StringIO('{"op": "det", "a": [[1, 2], [3, 4]]}\n' * 3)
+    profiler = profiling.Profiler()
+    run_batch(jobs, io.StringIO(), workers=2, profiler=profiler)
+    assert profiler.report()['det']['calls'] == 3
@@ -0,0 +1,94 @@
+import pytest
+
+from matrix import Matrix
+
+
+def test_constructor_converts_with_float():
+    assert Matrix([['1', '2'], [3, '4.5']]).data == ((1.0, 2.0), (3.0, 4.5))
+    with pytest.raises(ValueError):
+        Matrix([['1', 'x']])
+
+
+def test_data_is_read_only():
+    A = Matrix([[1.0, 2.0], [3.0, 4.0]])
+    with pytest.raises(TypeError):
+        A.data[0][0] = 5.0
+    assert A.data[0][0] == 1.0
+
+
+def test_writes_invalidate_caches_of_other_views():
+    B = Matrix([[2.0, 1.0], [1.0, 5.5]])
+    T = B.transpose()
+    assert T.det() == pytest.approx(10.0)
+    B.inverse(out=B)
+    assert T.det() == pytest.approx(0.1)
+
+    # and the other way round: a view written to, the owner re-reads
+    M = Matrix([[1.0, 2.0], [3.0, 4.0]])
+    M.det()
+    M[0:2, 0:2]._assign([4.0, 0.0, 0.0, 3.0])
+    assert M.det() == pytest.approx(12.0)
+
+
+def test_inverse_into_out():
+    A = Matrix([[4.0, 7.0], [2.0, 6.0]])
+    out = Matrix([[0.0, 0.0], [0.0, 0.0]])
+    assert A.inverse(out=out) is out
+    assert out == A.inverse()
+    # out can be a strided view, or the matrix itself
+    wide = Matrix([[0.0] * 4 for _ in range(2)])
+    A.inverse(out=wide[:, 0:4:2])
+    assert wide[:, 0:4:2] == A.inverse()
+    expected = A.inverse()
+    A.inverse(out=A)
+    assert A == expected
+
+
+def test_failed_inverse_into_out_leaves_it_unchanged():
+    A = Matrix([[1.0, 1e8], [0.0, 1.0]])
+    with pytest.raises(ValueError):
+        A.inverse(out=A)
+    assert A == Matrix([[1.0, 1e8], [0.0, 1.0]])
+
+
+def test_transposed_lu_solve():
+    A = Matrix([[0.0, 2.0, 1.0], [3.0, 1.0, -1.0], [1.0, 4.0, 2.0]])
+    z = A._lu_substitute_transpose([1.0, -2.0, 0.5])
+    expected = A.inverse().transpose() * Matrix([[1.0], [-2.0], [0.5]])
+    assert z == pytest.approx(expected._flat().tolist())
+
+def test_updates_invalidate_other_views():
+    A = Matrix([[1.0, 2.0], [3.0, 4.0]])
+    T = A.transpose()
+    T.det()
+    A.replace_row(0, [5.0, 0.0])
+    assert T.det() == pytest.approx(20.0)
+
+    M = Matrix([[2.0, 0.0, 0.0], [0.0, 3.0, 0.0], [0.0, 0.0, 1.0]])
+    M.det()
+    M[0:2, 0:2].rank_update([2.0, 0.0], [1.0, 0.0])
+    assert M.det() == pytest.approx(12.0)
+
+
+def test_updates_keep_the_lu_factorization():
+    A = Matrix([[4.0, 1.0, 0.0], [1.0, 5.0, 2.0], [0.0, 2.0, 6.0]])
+    b = [1.0, 2.0, 3.0]
+    A.solve(b)
+    A.replace_row(1, [0.5, 7.0, 1.0])
+    A.replace_column(0, [3.0, 1.0, 1.0])
+    A.rank_update([1.0, 0.0, 2.0], [0.0, 1.0, 1.0])
+    assert A._update is not None
+
+    fresh = A.copy()
+    assert A.solve(b) == pytest.approx(fresh.solve(b))
+    assert A.det() == pytest.approx(fresh.det())
+    assert A.inverse()._flat() == pytest.approx(fresh.inverse()._flat())
+
+
+def test_update_to_a_singular_matrix():
+    A = Matrix([[1.0, 0.0], [0.0, 1.0]])
+    A.inverse()
+    A.rank_update([1.0, 0.0], [-1.0, 0.0])
+    assert A.det() == 0.0
+    with pytest.raises(ValueError):
+        A.inverse()
@@ -0,0 +1,38 @@
+import pytest
+
+from matrix import Matrix
+
+
+def test_read_only_mapping_rejects_in_place_writes(tmp_path):
+    path = str(tmp_path / 'a.lamx')
+    Matrix([[4.0, 7.0], [2.0, 6.0]]).save(path)
+
+    A = Matrix.load(path, mmap=True)
+    with pytest.raises(ValueError):
+        A.inverse(out=A)
+    with pytest.raises(ValueError):
+        A.rank_update([1.0, 0.0], [1.0, 0.0])
+    assert A.data == ((4.0, 7.0), (2.0, 6.0))
+    assert A._inv is None
+
+    B = Matrix.load(path, mmap=True, writable=True)
+    B.inverse(out=B)
+    assert Matrix.load(path)._flat().tolist() == pytest.approx([0.6, -0.7, -0.2, 0.4])
+
+
+def test_writable_needs_mmap(tmp_path):
+    path = str(tmp_path / 'a.lamx')
+    Matrix([[1.0]]).save(path)
+    with pytest.raises(ValueError):
+        Matrix.load(path, writable=True)
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_truncated_file(tmp_path, mmap):
+    path = tmp_path / 'a.lamx'
+    Matrix([[1.0, 2.0], [3.0, 4.0]]).save(str(path))
+    data = path.read_bytes()
+    for size in (len(data) - 8, len(data) - 3):
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError, match='is truncated'):
+            Matrix.load(str(path), mmap=mmap)
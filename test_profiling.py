@@ -0,0 +1,21 @@
+import pickle
+
+import profiling
+from matrix import Matrix
+
+
+def test_pickle_round_trip_while_profiling():
+    A = Matrix([[1.0, 2.0], [3.0, 4.0]])
+    with profiling.profile():
+        data = pickle.dumps(A.inverse())
+        assert pickle.loads(data) == A.inverse()
+    # and pickles written while profiling load once it is off
+    assert pickle.loads(data) == A.inverse()
+
+
+def test_rref_row_operations_are_counted():
+    # one swap, two scalings, one elimination (the second row already has a zero)
+    A = Matrix([[0.0, 1.0], [2.0, 4.0]])
+    with profiling.profile() as p:
+        A.rref()
+    assert p.report()['rref']['row_operations'] == 4
@@ -1,25 +1,45 @@
+import operator
+from array import array
+from itertools import repeat
+from math import sqrt
+
+
 
 
 
 class Vector2d:
     '''This is a class for 2 dimensional vectors.'''
+    # _length caches the magnitude together with the components it was measured for,
+    # as a (x, y, length) tuple, so it is only recomputed after the vector changes
+    __slots__ = ('x', 'y', '_length')
+
     def __init__(self, x = None, y = None, length = None):
+        self._length = None
         if length is not None and (x is None or y is None):
-            self.length = length
             if x is None and y is not None:
                 self.y = y
                 self.x = (length ** 2 - y ** 2) ** 0.5
             elif y is None and x is not None:
                 self.x = x
                 self.y = (length ** 2 - x ** 2) ** 0.5
-        elif length is None and (x is not None and y is not None):
-            self.x = x
-            self.y = y
-            self.length = Vector2d.length(self)
+            else:
+                self.x = x
+                self.y = y
+            self._length = (self.x, self.y, length)
         else:
             self.x = x
             self.y = y
-            self.length = length
+            if length is not None:
+                self._length = (x, y, length)
+
+    @classmethod
+    def _new(cls, x, y):
+        '''Allocation-light constructor for arithmetic results (no argument handling)'''
+        v = object.__new__(cls)
+        v.x = x
+        v.y = y
+        v._length = None
+        return v
 
     @classmethod
     def zero(cls):
@@ -37,7 +57,16 @@ class Vector2d:
     def __add__(self, other):
         '''Simple vectors sum'''
         if isinstance(other, Vector2d):
-            return Vector2d(self.x + other.x, self.y + other.y)
+            return Vector2d._new(self.x + other.x, self.y + other.y)
+        else:
+            return NotImplemented
+
+    def __iadd__(self, other):
+        '''In-place sum, mutates this vector instead of allocating a new one'''
+        if isinstance(other, Vector2d):
+            self.x += other.x
+            self.y += other.y
+            return self
         else:
             return NotImplemented
 
@@ -48,13 +77,22 @@ class Vector2d:
             return self.dotp(k)
         elif isinstance(k, (int, float)):
             '''Scalar multiplication'''
-            return Vector2d(k * self.x, k * self.y)
+            return Vector2d._new(k * self.x, k * self.y)
         else:
             return NotImplemented
 
     def __rmul__(self, k):
         return self.__mul__(k)
 
+    def __imul__(self, k):
+        '''In-place scalar multiplication (a dot product still returns a number)'''
+        if isinstance(k, (int, float)):
+            self.x *= k
+            self.y *= k
+            return self
+        else:
+            return NotImplemented
+
     def dotp(self, other):
         '''Dot product'''
         if isinstance(other, Vector2d):
@@ -69,9 +107,24 @@ class Vector2d:
         else:
             return False
 
+    @property
     def length(self):
-        '''Calculate the length (magnitude) of the provided vector'''
-        return (self.x ** 2 + self.y ** 2) ** 0.5
+        '''Length (magnitude) of the vector, computed on first access and cached'''
+        x, y = self.x, self.y
+        cached = self._length
+        if cached is not None and cached[0] == x and cached[1] == y:
+            return cached[2]
+        if x is None or y is None:
+            return None
+        length = sqrt(x * x + y * y)
+        self._length = (x, y, length)
+        return length
+
+    @length.setter
+    def length(self, value):
+        # length used to be a plain attribute, setting it still works: the value is
+        # kept until the components change
+        self._length = (self.x, self.y, value)
 
 
 
@@ -80,9 +133,22 @@ class Vector2d:
 
 
 class Vector3d(Vector2d):
+    __slots__ = ('z',)
+
     def __init__(self, x, y, z = None, length = None):
-        super().__init__(x, y)
+        self.x = x
+        self.y = y
         self.z = z
+        self._length = None if length is None else (x, y, z, length)
+
+    @classmethod
+    def _new(cls, x, y, z):
+        v = object.__new__(cls)
+        v.x = x
+        v.y = y
+        v.z = z
+        v._length = None
+        return v
 
     @classmethod
     def zero(cls):
@@ -96,7 +162,16 @@ class Vector3d(Vector2d):
 
     def __add__(self, other):
         if isinstance(other, Vector3d):
-            return Vector3d(self.x + other.x, self.y + other.y, self.z + other.z)
+            return Vector3d._new(self.x + other.x, self.y + other.y, self.z + other.z)
+        else:
+            return NotImplemented
+
+    def __iadd__(self, other):
+        if isinstance(other, Vector3d):
+            self.x += other.x
+            self.y += other.y
+            self.z += other.z
+            return self
         else:
             return NotImplemented
 
@@ -107,13 +182,22 @@ class Vector3d(Vector2d):
         if isinstance(k, Vector3d):
             return self.dotp(k)
         elif isinstance(k, (int, float)):
-            return Vector3d(k * self.x, k * self.y, k * self.z)
+            return Vector3d._new(k * self.x, k * self.y, k * self.z)
         else:
             return NotImplemented
 
     def __rmul__(self, k):
         return self.__mul__(k)
 
+    def __imul__(self, k):
+        if isinstance(k, (int, float)):
+            self.x *= k
+            self.y *= k
+            self.z *= k
+            return self
+        else:
+            return NotImplemented
+
     def dotp(self, other):
         if isinstance(other, Vector3d):
             return self.x * other.x + self.y * other.y + self.z * other.z
@@ -122,7 +206,7 @@ class Vector3d(Vector2d):
 
     def crossp(self, other):
         if isinstance(other, Vector3d):
-            return Vector3d(self.y * other.z - self.z * other.y, self.z * other.x - self.x * other.z, self.x * other.y - self.y * other.x)
+            return Vector3d._new(self.y * other.z - self.z * other.y, self.z * other.x - self.x * other.z, self.x * other.y - self.y * other.x)
         else:
             return False
 
@@ -131,5 +215,159 @@ class Vector3d(Vector2d):
             return True if self.dotp(other) == 0 else False
         else: return False
 
+    @property
     def length(self):
-        return (self.x ** 2 + self.y ** 2 + self.z ** 2) ** 0.5
+        x, y, z = self.x, self.y, self.z
+        cached = self._length
+        if cached is not None and cached[0] == x and cached[1] == y and cached[2] == z:
+            return cached[3]
+        if x is None or y is None or z is None:
+            return None
+        length = sqrt(x * x + y * y + z * z)
+        self._length = (x, y, z, length)
+        return length
+
+    @length.setter
+    def length(self, value):
+        self._length = (self.x, self.y, self.z, value)
+
+
+
+
+
+
+
+class Vector2dArray:
+    '''A batch of 2 dimensional vectors stored as one array per component (struct of arrays).
+    Every operation works on the whole batch at once, no Vector2d objects are created.'''
+    __slots__ = ('x', 'y')
+    _fields = ('x', 'y')
+    _element = Vector2d
+
+    def __init__(self, x = (), y = ()):
+        if len(x) != len(y):
+            raise ValueError("All components must have the same number of elements")
+        self.x = array('d', x)
+        self.y = array('d', y)
+
+    @classmethod
+    def _from_arrays(cls, *components):
+        '''Wraps existing component arrays without copying them'''
+        batch = object.__new__(cls)
+        for name, values in zip(cls._fields, components):
+            setattr(batch, name, values)
+        return batch
+
+    @classmethod
+    def zeros(cls, n):
+        return cls._from_arrays(*(array('d', bytes(8 * n)) for _ in cls._fields))
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        '''Builds a batch from a list of Vector2d'''
+        return cls([v.x for v in vectors], [v.y for v in vectors])
+
+    def to_vectors(self):
+        '''Converts the batch back to a list of Vector2d'''
+        return [Vector2d._new(x, y) for x, y in zip(self.x, self.y)]
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, i):
+        return Vector2d._new(self.x[i], self.y[i])
+
+    def __eq__(self, other):
+        if isinstance(other, Vector2dArray) and type(other) is type(self):
+            return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+        else:
+            return False
+
+    def __repr__(self):
+        return "<{} of {} vectors>".format(type(self).__name__, len(self))
+
+    def _components(self, other):
+        '''Component arrays of other, repeating a single vector across the whole batch'''
+        if isinstance(other, type(self)):
+            if len(other) != len(self):
+                raise ValueError("Both batches must have the same number of vectors")
+            return [getattr(other, name) for name in self._fields]
+        return [repeat(getattr(other, name)) for name in self._fields]
+
+    def _accepts(self, other):
+        return isinstance(other, (type(self), self._element))
+
+    def __add__(self, other):
+        '''Element-wise sum with another batch (or the same vector added to every element)'''
+        if self._accepts(other):
+            return self._from_arrays(*(array('d', map(operator.add, getattr(self, name), values))
+                                       for name, values in zip(self._fields, self._components(other))))
+        else:
+            return NotImplemented
+
+    def __mul__(self, k):
+        '''Scalar multiplication of every vector, or the dot products with another batch'''
+        if self._accepts(k):
+            return self.dotp(k)
+        elif isinstance(k, (int, float)):
+            return self._from_arrays(*(array('d', [k * v for v in getattr(self, name)]) for name in self._fields))
+        else:
+            return NotImplemented
+
+    def __rmul__(self, k):
+        return self.__mul__(k)
+
+    def dotp(self, other):
+        '''Dot products, one per vector'''
+        if self._accepts(other):
+            result = array('d', bytes(8 * len(self)))
+            for name, values in zip(self._fields, self._components(other)):
+                result = array('d', map(operator.add, result, map(operator.mul, getattr(self, name), values)))
+            return result
+        else:
+            return False
+
+    def isPerpendicular(self, other):
+        '''Mask telling, for every vector, if it is perpendicular to the matching one in other'''
+        if self._accepts(other):
+            return [d == 0 for d in self.dotp(other)]
+        else:
+            return False
+
+    def lengths(self):
+        '''Lengths (magnitudes) of every vector in the batch'''
+        return array('d', map(sqrt, self.dotp(self)))
+
+
+class Vector3dArray(Vector2dArray):
+    '''A batch of 3 dimensional vectors stored as one array per component.'''
+    __slots__ = ('z',)
+    _fields = ('x', 'y', 'z')
+    _element = Vector3d
+
+    def __init__(self, x = (), y = (), z = ()):
+        super().__init__(x, y)
+        if len(z) != len(x):
+            raise ValueError("All components must have the same number of elements")
+        self.z = array('d', z)
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        return cls([v.x for v in vectors], [v.y for v in vectors], [v.z for v in vectors])
+
+    def to_vectors(self):
+        return [Vector3d._new(x, y, z) for x, y, z in zip(self.x, self.y, self.z)]
+
+    def __getitem__(self, i):
+        return Vector3d._new(self.x[i], self.y[i], self.z[i])
+
+    def crossp(self, other):
+        '''Cross products, one per vector'''
+        if self._accepts(other):
+            ox, oy, oz = self._components(other)
+            x = array('d', [ay * bz - az * by for ay, az, by, bz in zip(self.y, self.z, oy, oz)])
+            y = array('d', [az * bx - ax * bz for ax, az, bx, bz in zip(self.x, self.z, ox, oz)])
+            z = array('d', [ax * by - ay * bx for ax, ay, bx, by in zip(self.x, self.y, ox, oy)])
+            return self._from_arrays(x, y, z)
+        else:
+            return False